@@ -0,0 +1,260 @@
+"""Benchmarks of the stages of the completion on generated source code.
+
+Run it from the repository root::
+
+   $ PYTHONPATH=plugin python benchmarks/bench_completion.py > results.json
+
+The sources are generated deterministically.  Every stage is run
+``--repeat`` times and the minimum and the median of the times are written
+as JSON, in milliseconds.  The caches are cleared before every repeat, so
+the stages are timed cold, only ``completion_warm`` is a repeated request.
+Compare the results of two runs with::
+
+   $ PYTHONPATH=plugin python benchmarks/bench_completion.py \\
+         --compare baseline.json
+"""
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from logilab.astng import MANAGER
+
+from vim_monty import cache
+from vim_monty import completion_builders
+from vim_monty import cursor_context
+from vim_monty import prefix_index
+from vim_monty import source
+
+
+STAGES = ('parse', 'scope', 'lookup', 'accessibles', 'filter_sort', 'build',
+          'completion_warm')
+
+BUFFER_ID = 'benchmark'
+BIG_MODULE = 'bench_big_module'
+
+
+def large_module(scale):
+    """Many module functions, the cursor completes a name in the last one.
+    """
+    lines = []
+    for index in range(50 * scale):
+        lines.append('def function_%d(argument):' % index)
+        lines.append('    return argument + %d' % index)
+        lines.append('')
+        lines.append('class Class%d(object):' % index)
+        lines.append('    ATTRIBUTE = %d' % index)
+        lines.append('')
+    lines.append('def last():')
+    lines.append('    function_1')
+    return '\n'.join(lines) + '\n', len(lines), '    function_1', 'function_1'
+
+
+def deep_hierarchy(scale):
+    """A long chain of subclasses, the cursor completes an instance member.
+    """
+    lines = ['class Class0(object):', '    pass', '']
+    depth = 10 * scale
+    for index in range(1, depth):
+        lines.append('class Class%d(Class%d):' % (index, index - 1))
+        for method in range(10):
+            lines.append('    def method_%d_%d(self):' % (index, method))
+            lines.append('        self.attribute_%d_%d = 1' % (index, method))
+        lines.append('')
+    lines.append('INSTANCE = Class%d()' % (depth - 1))
+    lines.append('INSTANCE.method_1')
+    return '\n'.join(lines) + '\n', len(lines), 'INSTANCE.method_1', 'method_1'
+
+
+def big_from_import(scale, directory):
+    """A from import of a module with many names.
+    """
+    names = ['NAME_%d = %d' % (index, index) for index in range(200 * scale)]
+    module_file = open(os.path.join(directory, BIG_MODULE + '.py'), 'w')
+    try:
+        module_file.write('\n'.join(names) + '\n')
+    finally:
+        module_file.close()
+    line = 'from bench_big_module import NAME_1'
+    return '\n\n' + line + '\n', 3, line, 'NAME_1'
+
+
+def broken_line(scale):
+    """A large module with a broken statement at the cursor.
+    """
+    src, _, _, _ = large_module(scale)
+    lines = src.split('\n')[:-3]
+    lines.append('def last(argument):')
+    lines.append('    value = function_1(argument, [function_')
+    lines.append('    return value')
+    line = '    value = function_1(argument, [function_'
+    return '\n'.join(lines) + '\n', len(lines) - 1, line, 'function_'
+
+
+def scenarios(scale, directory):
+    """Returns the (name, source, linenumber, line, base) of every scenario.
+    """
+    return [
+        ('large_module',) + large_module(scale),
+        ('deep_hierarchy',) + deep_hierarchy(scale),
+        ('big_from_import',) + big_from_import(scale, directory),
+        ('broken_line',) + broken_line(scale),
+    ]
+
+
+def clear_caches():
+    """Drops the cached analysis, so the next completion starts cold.
+    """
+    for node_cache in cache.NAMED_CACHES.itervalues():
+        node_cache.clear()
+    source.PyModule.INCREMENTAL_BUILDER.forget(BUFFER_ID)
+    MANAGER.astng_cache.pop(BIG_MODULE, None)
+
+
+def run_stages(src, linenumber, line, base):
+    """Runs the stages of one completion and returns their times in seconds.
+    """
+    builder = completion_builders.vim_completion_builder
+    # like Vim, the column is the start of the completed base
+    column = len(line) - len(base)
+    times = {}
+    file_state = source.FileState(line, src, linenumber, column)
+    start = time.time()
+    module = file_state.module()
+    times['parse'] = time.time() - start
+
+    start = time.time()
+    scope = module.scope(linenumber)
+    times['scope'] = time.time() - start
+
+    # only code is completed on a looked up context, imports are not
+    if file_state.cursor_context().kind == cursor_context.CODE:
+        start = time.time()
+        context = scope.lookup(file_state.context_string())
+        times['lookup'] = time.time() - start
+
+        start = time.time()
+        accessibles = context.accessibles()
+        times['accessibles'] = time.time() - start
+    else:
+        times['lookup'] = 0.0
+        start = time.time()
+        accessibles = file_state.accessibles()
+        times['accessibles'] = time.time() - start
+
+    start = time.time()
+    matches = prefix_index.matches(accessibles, base)
+    matches.sort(key=lambda accessible: accessible.sort_key())
+    times['filter_sort'] = time.time() - start
+
+    start = time.time()
+    for accessible in matches:
+        accessible.completion_entry(builder, file_state)
+    times['build'] = time.time() - start
+
+    source.completion(source.FileState(line, src, linenumber, column,
+                                       BUFFER_ID), base, builder)
+    start = time.time()
+    source.completion(source.FileState(line, src, linenumber, column,
+                                       BUFFER_ID), base, builder)
+    times['completion_warm'] = time.time() - start
+    return times
+
+
+def summarize(samples):
+    """Returns the minimum and the median of samples in milliseconds.
+    """
+    samples = sorted(samples)
+    median = samples[len(samples) // 2]
+    return {'min': round(samples[0] * 1000, 3),
+            'median': round(median * 1000, 3)}
+
+
+def run(repeat=5, scale=20):
+    """Runs every scenario repeat times and returns the results.
+    """
+    directory = tempfile.mkdtemp()
+    sys.path.insert(0, directory)
+    gc_enabled = gc.isenabled()
+    results = {}
+    try:
+        for name, src, linenumber, line, base in scenarios(scale, directory):
+            samples = dict((stage, []) for stage in STAGES)
+            for _ in range(repeat):
+                clear_caches()
+                gc.collect()
+                gc.disable()
+                try:
+                    times = run_stages(src, linenumber, line, base)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+                for stage, seconds in times.iteritems():
+                    samples[stage].append(seconds)
+            results[name] = dict((stage, summarize(stage_samples))
+                                 for stage, stage_samples
+                                 in samples.iteritems())
+    finally:
+        clear_caches()
+        sys.path.remove(directory)
+        shutil.rmtree(directory)
+    return {
+        'python': sys.version.split()[0],
+        'repeat': repeat,
+        'scale': scale,
+        'results': results,
+    }
+
+
+def compare(baseline, current, tolerance=0.2):
+    """Returns the lines describing the stages slower than in baseline.
+
+    A stage is slower if its minimum grew by more than tolerance.
+    """
+    lines = []
+    for name, stages in sorted(current['results'].iteritems()):
+        for stage, times in sorted(stages.iteritems()):
+            try:
+                old = baseline['results'][name][stage]['min']
+            except KeyError:
+                continue
+            if old and times['min'] > old * (1 + tolerance):
+                lines.append('%s %s: %.3f ms -> %.3f ms' % (
+                    name, stage, old, times['min']))
+    return lines
+
+
+def main(argv=None):
+    """Prints the results as JSON, see the module documentation.
+    """
+    args = list(sys.argv[1:] if argv is None else argv)
+    options = {'--repeat': 5, '--scale': 20, '--compare': None}
+    while args:
+        option = args.pop(0)
+        if option not in options or not args:
+            sys.stderr.write(
+                'usage: bench_completion.py [--repeat N] [--scale N] '
+                '[--compare BASELINE]\n')
+            return 2
+        options[option] = args.pop(0)
+    result = run(int(options['--repeat']), int(options['--scale']))
+    json.dump(result, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+    if options['--compare']:
+        baseline_file = open(options['--compare'])
+        try:
+            baseline = json.load(baseline_file)
+        finally:
+            baseline_file.close()
+        slower = compare(baseline, result)
+        for line in slower:
+            sys.stderr.write('slower: %s\n' % line)
+        return slower and 1 or 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
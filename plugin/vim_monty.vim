@@ -20,7 +20,6 @@ autocmd FileType python call PythonCompleteInit()
 
 function! PythonCompleteInit()
 python << eopython
-# improve this by running the completion functionality through an extra program
 sys.path.extend(vim.eval('s:pythonpath').split(os.linesep))
 sys.path.append(vim.eval('s:here'))
 try:
@@ -39,14 +38,141 @@ except ImportError:
 eopython
 
   setlocal omnifunc=vim_monty#Complete
+  command! -buffer MontyDefinition call vim_monty#GoToDefinition()
+  command! -buffer -nargs=? -complete=file MontyStats
+        \ call vim_monty#Stats(<q-args>)
 
   if !exists('g:vim_monty_debug')
     let g:vim_monty_debug = 0
   endif
 
+  if !exists('g:vim_monty_cache_dir')
+    let g:vim_monty_cache_dir = ''
+  endif
+
+  if !exists('g:vim_monty_server')
+    let g:vim_monty_server = 0
+  endif
+
+  if !exists('g:vim_monty_server_python')
+    let g:vim_monty_server_python = 'python'
+  endif
+
+  if !exists('g:vim_monty_timeout')
+    let g:vim_monty_timeout = 0
+  endif
+
+  if !exists('g:vim_monty_page_size')
+    let g:vim_monty_page_size = 0
+  endif
+
+  if !exists('g:vim_monty_profile_threshold')
+    let g:vim_monty_profile_threshold = 0
+  endif
+
+  if !exists('g:vim_monty_project_index')
+    let g:vim_monty_project_index = 0
+  endif
+
+  if !exists('g:vim_monty_prewarm')
+    let g:vim_monty_prewarm = 0
+  endif
+
+  if !exists('g:vim_monty_prewarm_depth')
+    let g:vim_monty_prewarm_depth = 2
+  endif
+
+  if !exists('g:vim_monty_prewarm_budget')
+    let g:vim_monty_prewarm_budget = 5000
+  endif
+
 python << eopython
 from vim_monty import logger
 logger.ENABLED = bool(int(vim.eval('g:vim_monty_debug')))
+vim_monty.disk_cache.configure(
+    os.path.expanduser(vim.eval('g:vim_monty_cache_dir')) or None)
+from vim_monty import stats
+stats.PROFILE_THRESHOLD = (
+    int(vim.eval('g:vim_monty_profile_threshold')) / 1000. or None)
+vim_monty_client = None
+if int(vim.eval('g:vim_monty_server')):
+    from vim_monty import client
+    vim_monty_client = client.get_client(
+        vim.eval('g:vim_monty_server_python'), [vim.eval('s:here')])
+    vim_monty_client.configure(
+        debug=logger.ENABLED, cache_dir=vim_monty.disk_cache.DIRECTORY,
+        project_root=(int(vim.eval('g:vim_monty_project_index')) and
+                      os.getcwd() or None),
+        profile_threshold=stats.PROFILE_THRESHOLD)
+    vim_monty_completion = vim_monty_client.completion
+    vim_monty_stats = vim_monty_client.stats
+    vim_monty_definition = vim_monty_client.definition
+    vim_monty_prewarm = vim_monty_client.prewarm
+elif int(vim.eval('g:vim_monty_timeout')):
+    import functools
+    from vim_monty import worker
+    vim_monty_completion = functools.partial(
+        worker.completion, budget=int(vim.eval('g:vim_monty_timeout')) / 1000.)
+else:
+    vim_monty_completion = vim_monty.completion
+# the background services are started once per Vim session, this function
+# runs for every python buffer
+vim_monty_start = not int(vim.eval("exists('s:vim_monty_started')"))
+vim.command('let s:vim_monty_started = 1')
+if not int(vim.eval('g:vim_monty_server')):
+    # the server keeps an index and checks the files itself
+    from vim_monty import dependencies
+    from vim_monty import module_index
+    if vim_monty_start:
+        module_index.INDEX.start(sys.path)
+        dependencies.GRAPH.start()
+    from vim_monty import definition
+    from vim_monty import prewarm
+    vim_monty_definition = definition.definition
+    vim_monty_stats = stats.STATS.as_dict
+    vim_monty_prewarm = prewarm.prewarm
+if int(vim.eval('g:vim_monty_project_index')):
+    from vim_monty import project_index
+    if vim_monty.disk_cache.DIRECTORY:
+        vim_monty_index_file = project_index.index_file_path(
+            vim_monty.disk_cache.DIRECTORY, os.getcwd())
+        if vim_monty_start:
+            project_index.start_indexer(
+                os.getcwd(), vim_monty_index_file,
+                vim.eval('g:vim_monty_server_python'), [vim.eval('s:here')])
+        if not int(vim.eval('g:vim_monty_server')):
+            definition.load_project_index(os.getcwd(), vim_monty_index_file)
+from vim_monty import snapshot
+from vim_monty import vim_values
+# the position and the lines of the last completion, and the index of the
+# page shown there
+vim_monty_pages = [None, None, 0]
+# the buffer state seen by findstart, and the last completion request with
+# its lines and result, see vim_monty#Complete
+vim_monty_request = None
+vim_monty_result = [None, None, None]
+
+
+def vim_monty_buffer_lines():
+    """Returns the lines of the current buffer, copied only after changes.
+    """
+    buffer = vim.current.buffer
+    changedtick = int(vim.eval('b:changedtick'))
+    lines = snapshot.SNAPSHOTS.update(buffer.number, changedtick,
+                                      lambda: buffer[:]).lines
+    if vim_monty_client is not None:
+        vim_monty_client.sync(buffer.number, changedtick, lines)
+    return lines
+
+if int(vim.eval('g:vim_monty_prewarm')):
+    try:
+        vim_monty_prewarm(vim_monty_buffer_lines(),
+                          vim.current.buffer.name,
+                          int(vim.eval('g:vim_monty_prewarm_depth')),
+                          int(vim.eval('g:vim_monty_prewarm_budget')) / 1000.)
+    except Exception, exc:
+        from vim_monty.logger import log
+        log(exc)
 
 eopython
 endfunction
@@ -59,20 +185,99 @@ python << eopython
 row, column = vim.current.window.cursor
 line = vim.current.buffer[row-1]
 index = vim_monty.find_base_column(line, column)
-vim.command('let g:vim_monty_column = %d' % index)
-vim.command('let g:vim_monty_line = %r' % line)
+# Vim removes the base from the buffer before the second call, the snapshot
+# taken here is used for the completion instead of reading the buffer again
+try:
+    lines = vim_monty_buffer_lines()
+except Exception, exc:
+    from vim_monty.logger import log
+    log(exc)
+    lines = vim.current.buffer[:]
+vim_monty_request = (row, index, line, lines)
 vim.command('return %d' % index)
 eopython
     else
 python << eopython
-column = int(vim.eval('g:vim_monty_column'))
-row, _column = vim.current.window.cursor
-line = vim.eval('g:vim_monty_line')
-source = '\n'.join(vim.current.buffer[:])
+row, column, line, source = vim_monty_request
 base = vim.eval("a:base")
-completions = vim_monty.completion(source, line, row, column, base,
-                                   vim_monty.vim_completion_builder)
-vim.command('return %s' % completions)
+limit = None
+start = 0
+page_size = int(vim.eval('g:vim_monty_page_size'))
+if page_size:
+    # completing the same position of the same lines again shows the next
+    # page, the lines are the same object until b:changedtick changes
+    position = (vim.current.buffer.number, row, column, line)
+    if vim_monty_pages[0] == position and (vim_monty_pages[1] is source or
+                                           vim_monty_pages[1] == source):
+        vim_monty_pages[2] += 1
+    else:
+        vim_monty_pages[:] = [position, source, 0]
+    limit = page_size
+    start = page_size * vim_monty_pages[2]
+# completing again without changes, the buffer has a new changedtick but
+# the same lines
+request = (vim.current.buffer.number, row, column, line, base, limit, start)
+if vim_monty_result[0] == request and vim_monty_result[1] == source:
+    completions = vim_monty_result[2]
+else:
+    try:
+        completions = vim_monty_completion(source, line, row, column, base,
+                                           vim_monty.vim_completion_builder,
+                                           vim.current.buffer.number,
+                                           limit=limit, start=start)
+        if not completions and start:
+            # after the last page the first one is shown again
+            vim_monty_pages[2] = 0
+            completions = vim_monty_completion(
+                source, line, row, column, base,
+                vim_monty.vim_completion_builder, vim.current.buffer.number,
+                limit=limit)
+    except Exception, exc:
+        from vim_monty.logger import log
+        log(exc)
+        completions = []
+    if completions:
+        vim_monty_result[:] = [request, source, completions]
+vim_values.let(vim, 'l:completions', completions, vim.eval('&encoding'))
 eopython
+    return l:completions
     endif
 endfunction
+
+
+function! vim_monty#GoToDefinition()
+python << eopython
+row, column = vim.current.window.cursor
+try:
+    location = vim_monty_definition(vim_monty_buffer_lines(),
+                                    vim.current.buffer[row-1], row, column,
+                                    vim.current.buffer.number)
+except Exception, exc:
+    from vim_monty.logger import log
+    log(exc)
+    location = None
+if location is None:
+    vim.command('echo "vim-monty: no definition found"')
+else:
+    path, linenumber = location
+    vim.command("normal! m'")
+    if path:
+        vim_values.let(vim, 's:vim_monty_path', path, vim.eval('&encoding'))
+        vim.command("execute 'edit' fnameescape(s:vim_monty_path)")
+    vim.current.window.cursor = (linenumber, 0)
+    vim.command('normal! ^')
+eopython
+endfunction
+
+
+function! vim_monty#Stats(path)
+python << eopython
+from vim_monty import stats
+statistics = vim_monty_stats()
+if vim.eval('a:path'):
+    stats.dump(statistics, os.path.expanduser(vim.eval('a:path')))
+else:
+    for line in stats.summarize(statistics).split('\n'):
+        vim.command('echo %s' % vim_values.vim_string(line))
+eopython
+endfunction
@@ -2,14 +2,20 @@
 """
 from vim_monty import source
 from vim_monty import completion_builders
+from vim_monty import cursor_context
+from vim_monty import disk_cache
 
 
 def reload_submodules():
     """Reload every imported module to simplify development.
+
+    Modules with a true ``KEEP_ON_RELOAD``, whose threads and locks are
+    shared by the running requests, are kept.
     """
     for name, value in globals().iteritems():
         if(not name.startswith('__') and not name.endswith('__') and
-           value.__class__.__name__ == 'module'):
+           value.__class__.__name__ == 'module' and
+           not getattr(value, 'KEEP_ON_RELOAD', False)):
             if hasattr(value, 'reload_submodules'):
                 value.reload_submodules()
             reload(value)
@@ -21,20 +27,31 @@ vim_completion_builder = completion_builders.vim_completion_builder
 
 
 def find_base_column(line, column):
-    # TODO: This method is a copy from pysmell, but it's not perfect.
-    index = column
-    # col points at the end of the completed string
-    # so col-1 is the last character of base
-    while index > 0:
-        index -= 1
-        if line[index] in '. ([{:,=<>':
-            index += 1
-            break
-    return index # this is zero based :S
- 
-
-def completion(src, line, lineno, column, base, completion_builder=None):
+    """Returns the zero based column where the name completed at column starts.
+    """
+    return cursor_context.base_column(line, column)
+
+
+def completion(src, line, lineno, column, base, completion_builder=None,
+               buffer_id=None, limit=None, start=0):
     """This is the entry point for the completion.
+
+    The source *src* is a string or a list of lines, a list avoids copying
+    big buffers (see ``vim_monty.snapshot``).  Pass a *buffer_id* to reuse
+    the parse results of previous calls with the same id.  With a *limit*
+    only limit entries are returned, skipping the first *start* entries.
+    """
+    file_state = source.FileState(line, src, lineno, column, buffer_id)
+    return source.completion(file_state, base, completion_builder, limit,
+                             start)
+
+
+def completion_pages(src, line, lineno, column, base, completion_builder=None,
+                     buffer_id=None, page_size=source.PAGE_SIZE):
+    """Like completion, but yields the entries in pages of page_size.
+
+    Only the entries of the requested pages are built.
     """
-    file_state = source.FileState(line, src, lineno, column)
-    return source.completion(file_state, base, completion_builder)
+    file_state = source.FileState(line, src, lineno, column, buffer_id)
+    return source.completion_pages(file_state, base, completion_builder,
+                                   page_size)
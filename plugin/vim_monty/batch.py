@@ -0,0 +1,146 @@
+"""Completion of many cursor positions, for scripts and tools.
+
+A query is a tuple ``(path, linenumber, column)`` of a python file, a one
+based line number and the column of the cursor, at the end of the
+completed base.  The queries are grouped by file, every file is read and
+parsed once, and queries in the same scope with the same context share
+their accessibles.  Every query is recorded as completion request in
+``vim_monty.stats`` and failures are logged like in
+``vim_monty.source.completion``.  ``batch_completion`` yields the results
+while they are calculated, optionally by a pool of processes::
+
+   for query, completions in batch_completion(queries, processes=4):
+       ...
+"""
+import multiprocessing
+from collections import OrderedDict
+
+import vim_monty
+from vim_monty import cache
+from vim_monty import completion_builders
+from vim_monty import source
+from vim_monty.logger import log
+from vim_monty.stats import STATS
+
+
+def group_by_file(queries):
+    """Returns a list of (path, queries) in the order of the queries.
+    """
+    groups = OrderedDict()
+    for query in queries:
+        groups.setdefault(query[0], []).append(query)
+    return groups.items()
+
+
+def complete_file(path, queries, completion_builder=None):
+    """Yields (query, completions) of the queries of the file path.
+
+    The unchanged file is parsed once.  Only if it does not parse, the
+    cursor line of every query is repaired on an incremental build.
+    """
+    source_file = open(path)
+    try:
+        lines = source_file.read().split('\n')
+    finally:
+        source_file.close()
+    try:
+        module = source.PyModule(
+            source.PyModule.INCREMENTAL_BUILDER.build(lines))
+    except Exception, exc:
+        log("Could not parse %s, repairing every query: %r" % (path, exc))
+        module = None
+    shared = {}
+    for query in queries:
+        _, linenumber, column = query
+        line = lines[linenumber - 1]
+        base_column = vim_monty.find_base_column(line, column)
+        base = line[base_column:column]
+        buffer_id = None if module else path
+        file_state = source.FileState(line, lines, linenumber, base_column,
+                                      buffer_id, module)
+        with cache.LOCK, STATS.request('completion'):
+            try:
+                accessibles = query_accessibles(file_state, shared)
+                # nobody waits for a popup, so every entry is resolved
+                entries = source.completion_entries(accessibles, file_state,
+                                                    base, completion_builder,
+                                                    resolve_limit=None)
+            except Exception, exc:
+                log("Completion of %r failed:" % (query,))
+                source.request_failed(exc)
+                entries = []
+        yield query, entries
+
+
+def query_accessibles(file_state, shared):
+    """Returns the accessibles of file_state.
+
+    The accessibles of code are shared by the queries with the same scope
+    and context, shared maps them by both.
+    """
+    if (file_state.need_import_statement() or file_state.is_import_path() or
+        file_state.is_from_import()):
+        return source.request_accessibles(file_state)
+    with STATS.span('accessibles'):
+        scope = file_state.module().scope(file_state.linenumber)
+        context_string = file_state.context_string()
+        key = (id(scope.astng_element), context_string)
+        # the scope is kept with the accessibles, so its id is not reused by
+        # another scope
+        if key not in shared:
+            shared[key] = (scope.astng_element,
+                           scope.lookup(context_string).accessibles())
+        return shared[key][1]
+
+
+def complete_group(path, queries, completion_builder=None):
+    """Like complete_file, but yields empty results for unreadable files.
+    """
+    try:
+        results = complete_file(path, queries, completion_builder)
+        for result in results:
+            yield result
+    except IOError, exc:
+        log("Could not read %s: %r" % (path, exc))
+        for query in queries:
+            yield query, []
+
+
+def _complete_group(args):
+    """Pool version of complete_group, returns the list of results.
+
+    The completion builder is given by its name.
+    """
+    path, queries, builder = args
+    completion_builder = builder and getattr(completion_builders, builder)
+    return list(complete_group(path, queries, completion_builder))
+
+
+def batch_completion(queries, completion_builder=None, processes=1):
+    """Yields (query, completions) of every query.
+
+    The results of one file are yielded together, in the order of the
+    queries of the file.  With more than one process, the files are
+    completed by a process pool and the files are yielded in the order
+    they are finished.  The completion builder has to be one of
+    ``vim_monty.completion_builders`` then.
+    """
+    groups = group_by_file(queries)
+    if processes == 1 or len(groups) < 2:
+        for path, file_queries in groups:
+            for result in complete_group(path, file_queries,
+                                         completion_builder):
+                yield result
+        return
+    builder = completion_builder and completion_builder.__name__
+    pool = multiprocessing.Pool(processes)
+    try:
+        for results in pool.imap_unordered(
+                _complete_group,
+                [(path, file_queries, builder)
+                 for path, file_queries in groups]):
+            for result in results:
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
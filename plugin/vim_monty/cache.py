@@ -0,0 +1,99 @@
+"""Caches of data derived from astng elements.
+
+The entries are keyed by the identity of astng elements.  An entry is only
+valid as long as the modules it was derived from keep their parse
+generation (see ``vim_monty.incremental.generation``).
+
+The analysis state, the astng manager and these caches, is shared by the
+threads of the worker and the pre-warmer and Vim's thread.  It is only
+used while holding ``LOCK``.
+"""
+from collections import OrderedDict
+from threading import RLock
+
+from vim_monty.incremental import generation
+
+
+# LOCK and the caches survive reload_submodules
+KEEP_ON_RELOAD = True
+
+# the caches created with a name, see vim_monty.stats
+NAMED_CACHES = {}
+
+LOCK = RLock()
+
+
+class NodeCache(object):
+    """A least recently used cache of values derived from astng elements.
+
+    At most *max_entries* values are kept.  With a *weigh* function, which
+    returns the (estimated) size of a value, the least recently used values
+    are dropped as well while the sum of all sizes exceeds *max_weight*.
+    The hits and misses are counted, a cache with a *name* is registered in
+    ``NAMED_CACHES``.
+    """
+    def __init__(self, max_entries=1000, max_weight=None, weigh=None,
+                 name=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if name:
+            NAMED_CACHES[name] = self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, astng_element, extra=None, default=None):
+        """Returns the valid value stored for astng_element and extra.
+        """
+        key = (id(astng_element), extra)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return default
+        cached_element, value, dependencies, weight = entry
+        if cached_element is not astng_element:
+            self.weight -= weight
+            self.misses += 1
+            return default
+        for module, module_generation in dependencies:
+            if generation(module) != module_generation:
+                self.weight -= weight
+                self.misses += 1
+                return default
+        self._entries[key] = entry
+        self.hits += 1
+        return value
+
+    def set(self, astng_element, value, depends_on=(), extra=None):
+        """Stores value for astng_element and extra.
+
+        The value depends on the module of astng_element and on the modules
+        of the elements in depends_on.
+        """
+        modules = dict((id(element.root()), element.root())
+                       for element in (astng_element,) + tuple(depends_on))
+        dependencies = [(module, generation(module))
+                        for module in modules.itervalues()]
+        key = (id(astng_element), extra)
+        old_entry = self._entries.pop(key, None)
+        if old_entry is not None:
+            self.weight -= old_entry[3]
+        weight = self.weigh and self.weigh(value) or 0
+        self._entries[key] = (astng_element, value, dependencies, weight)
+        self.weight += weight
+        while self._entries and (
+            len(self._entries) > self.max_entries or
+            (self.max_weight is not None and self.weight > self.max_weight)):
+            self.weight -= self._entries.popitem(last=False)[1][3]
+        return value
+
+    def clear(self):
+        """Drops all entries.
+        """
+        self._entries.clear()
+        self.weight = 0
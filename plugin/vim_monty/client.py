@@ -0,0 +1,270 @@
+"""Client of the completion server in ``vim_monty.server``.
+
+The client starts the server as child process on the first request and
+talks to it through its stdin and stdout.  The output of the server on
+stderr goes to the log file.  Use ``get_client`` to share one server between
+all buffers.
+"""
+import atexit
+import json
+import os
+from Queue import Empty, Queue
+import subprocess
+from threading import Thread
+import time
+
+from vim_monty import logger
+from vim_monty.logger import log
+from vim_monty.snapshot import SnapshotStore, changed_range
+
+
+CLIENTS = {}
+
+# seconds a call waits for its response, a slow server keeps running
+TIMEOUT = 10.0
+# seconds without any response to waiting requests until the server is
+# killed, a cold import of a big library may take longer than a call waits
+HANG_TIMEOUT = 120.0
+
+
+def encode(value):
+    """Converts the unicode strings of a decoded JSON value to utf-8 strings.
+
+    Vim does not understand the repr of unicode strings.
+    """
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    if isinstance(value, dict):
+        return dict((encode(key), encode(item))
+                    for key, item in value.iteritems())
+    return value
+
+
+class ServerError(Exception):
+    """The server answered a request with an error, or did not answer.
+    """
+
+
+def read_lines(stream, lines):
+    """Puts the lines of stream into the queue lines, None at its end.
+    """
+    for line in iter(stream.readline, ''):
+        lines.put(line)
+    lines.put(None)
+
+
+class Client(object):
+    """Sends requests to a completion server process.
+
+    *python* is the interpreter to run the server with, *path* a list of
+    directories added to the PYTHONPATH of the server.  A request fails
+    after *timeout* seconds without response, the server keeps working on
+    it.  A server which answers nothing for *hang_timeout* seconds is
+    killed.
+    """
+    def __init__(self, python='python', path=(), timeout=TIMEOUT,
+                 hang_timeout=HANG_TIMEOUT):
+        self.python = python
+        self.path = list(path)
+        self.timeout = timeout
+        self.hang_timeout = hang_timeout
+        self.process = None
+        self.settings = {}
+        self._last_id = 0
+        self._responses = None
+        self._waiting_since = None
+        self._snapshots = SnapshotStore()
+
+    def start(self):
+        """Starts the server process.
+        """
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            self.path + [env.get('PYTHONPATH', '')]).rstrip(os.pathsep)
+        output = logger.output_file()
+        try:
+            self.process = subprocess.Popen(
+                [self.python, '-m', 'vim_monty.server'], env=env,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=output)
+        finally:
+            output.close()
+        # the responses are read by a thread, so they can be waited for
+        # with a timeout
+        self._responses = Queue()
+        reader = Thread(target=read_lines,
+                        args=(self.process.stdout, self._responses))
+        reader.daemon = True
+        reader.start()
+        self._waiting_since = None
+        self._snapshots = SnapshotStore()
+        if self.settings:
+            self.call('configure', **self.settings)
+
+    def close(self, kill=False):
+        """Stops the server process, kill it if it does not answer.
+        """
+        if self.process is not None and self.process.poll() is None:
+            if kill:
+                self.process.kill()
+            else:
+                self.process.stdin.close()
+            self.process.wait()
+        self.process = None
+
+    def call(self, method, **params):
+        """Calls method on the server and returns the result.
+
+        A dead server is restarted once.  A call without response in time
+        raises a ServerError, a hanging server is killed and restarted by
+        the next call.
+        """
+        self._last_id += 1
+        request_id = self._last_id
+        request = json.dumps({'id': request_id, 'method': method,
+                              'params': params})
+        for retry in (False, True):
+            if self.process is None or self.process.poll() is not None:
+                self.start()
+            try:
+                if self._waiting_since is None:
+                    self._waiting_since = time.time()
+                self.process.stdin.write(request + '\n')
+                self.process.stdin.flush()
+                response = self._receive(request_id)
+            except IOError, exc:
+                log("Completion server failed: %r" % exc)
+                response = None
+            if response is not None:
+                break
+            self.close()
+            if retry:
+                raise ServerError('The completion server does not answer.')
+        if 'error' in response:
+            raise ServerError(response['error']['message'])
+        return encode(response['result'])
+
+    def _receive(self, request_id):
+        """Returns the response of the request, None if the server ended.
+
+        Responses of other requests, which timed out before, are dropped.
+        Raises ServerError if the server does not answer within the timeout,
+        the server is killed if it answered nothing for the hang timeout.
+        """
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                line = self._responses.get(
+                    timeout=max(deadline - time.time(), 0))
+            except Empty:
+                waiting_since = self._waiting_since or time.time()
+                if time.time() - waiting_since >= self.hang_timeout:
+                    log("Killing the hanging completion server.")
+                    self.close(kill=True)
+                raise ServerError('The completion server timed out.')
+            if line is None:
+                return None
+            try:
+                response = json.loads(line)
+            except ValueError:
+                log("Invalid response: %r" % line)
+                continue
+            if response.get('id') == request_id:
+                # the server answers in order, no request is waiting
+                self._waiting_since = None
+                return response
+            # the server still works on the requests after this one
+            self._waiting_since = time.time()
+            log("Dropped response of request %r" % response.get('id'))
+
+    def configure(self, **settings):
+        """Sets options of the server, they survive restarts of the server.
+
+        See ``vim_monty.server.configure``.
+        """
+        self.settings = settings
+        return self.call('configure', **settings)
+
+    def sync(self, buffer_id, changedtick, lines):
+        """Sends the lines of the buffer at changedtick to the server.
+
+        Only the lines changed since the last sync are sent, unless the
+        server does not know the buffer.
+        """
+        synced = self._snapshots.get(buffer_id)
+        if synced is not None and synced.changedtick == changedtick and \
+           synced.lines is lines:
+            return
+        try:
+            if synced is None:
+                raise ServerError('The buffer is not synced yet.')
+            start, end, replacement = (changed_range(synced.lines, lines) or
+                                       (0, 0, []))
+            self.call('update_buffer', buffer_id=buffer_id,
+                      base_changedtick=synced.changedtick,
+                      changedtick=changedtick, start=start, end=end,
+                      replacement=replacement)
+        except ServerError:
+            self.call('update_buffer', buffer_id=buffer_id,
+                      base_changedtick=None, changedtick=changedtick,
+                      start=0, end=0, replacement=lines)
+        self._snapshots.store(buffer_id, changedtick, lines)
+
+    def _source(self, src, buffer_id):
+        """Returns None if src are the synced lines of the buffer, else src.
+        """
+        synced = self._snapshots.get(buffer_id)
+        if synced is not None and synced.lines is src:
+            return None
+        return src
+
+    def completion(self, src, line, lineno, column, base,
+                   completion_builder=None, buffer_id=None, limit=None,
+                   start=0):
+        """Like vim_monty.completion, but runs in the server.
+
+        The lines of a buffer sent with ``sync`` are not sent again.
+        """
+        builder = completion_builder and completion_builder.__name__
+        return self.call('completion', src=self._source(src, buffer_id),
+                         line=line, lineno=lineno, column=column, base=base,
+                         builder=builder, buffer_id=buffer_id, limit=limit,
+                         start=start)
+
+    def definition(self, src, line, lineno, column, buffer_id=None):
+        """Like vim_monty.definition.definition, but runs in the server.
+        """
+        result = self.call('definition', src=self._source(src, buffer_id),
+                           line=line, lineno=lineno, column=column,
+                           buffer_id=buffer_id)
+        return result and tuple(result)
+
+    def stats(self):
+        """Returns the statistics of the server, see vim_monty.stats.
+        """
+        return self.call('stats')
+
+    def prewarm(self, src, path=None, max_depth=2, budget=5.0):
+        """Like vim_monty.prewarm.prewarm, but warms the server.
+        """
+        return self.call('prewarm', src=src, path=path, max_depth=max_depth,
+                         budget=budget)
+
+
+def get_client(python='python', path=()):
+    """Returns the shared client for the given interpreter and path.
+    """
+    key = (python, tuple(path))
+    if key not in CLIENTS:
+        CLIENTS[key] = Client(python, path)
+    return CLIENTS[key]
+
+
+def close_clients():
+    """Stops every server started by the shared clients.
+    """
+    for client in CLIENTS.values():
+        client.close()
+
+atexit.register(close_clients)
@@ -1,6 +1,8 @@
 """Should contain functions to build a completion entry by one language element
 
-At this point only a builder for VIM exists.
+At this point only a builder for VIM exists.  A builder may have a
+``deferred`` attribute, the builder used for entries which are too expensive
+to resolve (see ``vim_monty.source.completion_entries``).
 """
 from vim_monty.logger import log
 
@@ -10,9 +12,8 @@ def vim_completion_builder(completionable, file_state):
     """
     try:
         complex_name = completionable.complex_name()
-        if file_state:
-            if file_state.is_import_path() or file_state.is_from_import():
-                complex_name = completionable.name()
+        if file_state and file_state.cursor_context().in_import():
+            complex_name = completionable.name()
         return {
             'word': complex_name,
             'abbr': completionable.name(),
@@ -25,3 +26,19 @@ def vim_completion_builder(completionable, file_state):
         import traceback
         log(traceback.format_exc())
         return completionable.name()
+
+
+def vim_deferred_completion_builder(completionable, file_state):
+    """Completion builder for a VIM entry which is not resolved yet.
+
+    Only the name is used, so nothing is imported or inferred.
+    """
+    return {
+        'word': completionable.name(),
+        'abbr': completionable.name(),
+        'kind': completionable.KIND,
+        'menu': '',
+        'dup': '1',
+    }
+
+vim_completion_builder.deferred = vim_deferred_completion_builder
@@ -7,7 +7,11 @@ class Completionable(object):
 
     Completionalbe is the support of the completion_entry, and startswith
     methods.  This class is extended by the LanguageElement classes.
+
+    Completions create many of these objects, so they have no ``__dict__``.
+    Subclasses have to define ``__slots__`` too.
     """
+    __slots__ = ('_name',)
     KIND = '?'
 
     def __init__(self, name):
@@ -33,21 +37,34 @@ class Completionable(object):
         """
         return self.KIND
 
+    def is_deferred(self):
+        """True if complex_name and kind of this element are expensive.
+
+        Like elements imported with from, which have to import their module
+        first.  See ``vim_monty.source.completion_entries``.
+        """
+        return False
+
     def linenumber(self):
         """The completionable is defined on the resulting linenumber
         """
         return ''
 
+    def sort_key(self):
+        """Returns the key to sort completionables by.
+
+        Public names come first, then the names starting with one underscore
+        and at last the names starting with two underscores.
+        """
+        name = self.name()
+        if name.startswith('__'):
+            return (2, name)
+        if name.startswith('_'):
+            return (1, name)
+        return (0, name)
+
     def __cmp__(self, other):
-        if self.startswith('__') and not other.startswith('__'):
-            return 1
-        if not self.startswith('__') and other.startswith('__'):
-            return -1
-        if self.startswith('_') and not other.startswith('_'):
-            return 1
-        if not self.startswith('_') and other.startswith('_'):
-            return -1
-        return cmp(self.name(), other.name())
+        return cmp(self.sort_key(), other.sort_key())
 
     def __eq__(self, other):
         return self.name() == other.name()
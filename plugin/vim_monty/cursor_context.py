@@ -0,0 +1,206 @@
+"""Classifies the position of the cursor in one pass.
+
+The statement at the cursor may span several lines, like a parenthesized
+from import or a call with its arguments on continuation lines.  Its first
+line is searched upwards from the cursor (see ``statement_start``), then
+the statement is scanned once up to the cursor, skipping the contents of
+strings and comments.  ``analyze`` returns the resulting ``CursorContext``,
+``vim_monty.source.FileState`` keeps it for the whole request.
+"""
+import re
+
+
+CODE = 'code'
+STRING = 'string'
+COMMENT = 'comment'
+# ``import os.pa`` or ``from os.pa``
+IMPORT_PATH = 'import_path'
+# ``from os import pa``
+FROM_IMPORT = 'from_import'
+# ``from os `` needs the import keyword
+NEED_IMPORT = 'need_import'
+
+# lines searched upwards for the first line of the statement at the cursor
+MAX_STATEMENT_LINES = 50
+
+TRIPLE_QUOTES = ('"""', "'''")
+SPECIAL = re.compile(r'"""|\'\'\'|["\'#()\[\]{};\\]')
+# the end of a string started by the quote, or an escaped character
+STRING_ENDS = dict((quote, re.compile(r'\\(?:.|$)|' + re.escape(quote)))
+                   for quote in ('"', "'") + TRIPLE_QUOTES)
+# a line ending with one of these is continued by the next line
+CONTINUING = ',\\([{+-*/%&|^'
+# a line starting with one of these continues the previous line
+CONTINUATION = ')]}.+-*/%&|^=<>'
+WORDS = re.compile(r'[\w.]+|\S')
+DOTTED_NAME = re.compile(r'[\w.]*$')
+NAME = re.compile(r'\w*$')
+
+
+def base_column(line, column):
+    """Returns the column where the completed name before column starts.
+    """
+    return column - len(NAME.search(line[:column]).group())
+
+
+def indentation(line):
+    """Returns the number of leading white space characters of line.
+    """
+    return len(line) - len(line.lstrip())
+
+
+def triple_quotes(line):
+    """Returns the number of triple quotes in line.
+    """
+    return sum(line.count(quote) for quote in TRIPLE_QUOTES)
+
+
+def statement_start(lines, index, line):
+    """Returns the index of the first line of the statement at lines[index].
+
+    line is the text of lines[index].  A line is the first one if the line
+    above does not continue on it, it is not more indented than the next
+    line unless it opens a block or continues, and the triple quotes from it
+    up to the cursor are balanced.  Without such a line near the cursor, the
+    cursor line is returned.
+    """
+    below = line
+    quotes = triple_quotes(line)
+    for start in range(index, max(index - MAX_STATEMENT_LINES, -1), -1):
+        text = line if start == index else lines[start]
+        if start != index:
+            quotes += triple_quotes(text)
+        stripped = text.strip()
+        above = lines[start - 1].rstrip() if start > 0 else ''
+        if stripped:
+            is_start = (stripped[0] not in CONTINUATION + '#' and
+                        not (above and above[-1] in CONTINUING) and
+                        (indentation(text) >= indentation(below) or
+                         stripped[-1] in ':' + CONTINUING))
+            if is_start and quotes % 2 == 0:
+                return start
+            below = text
+    return index
+
+
+class CursorContext(object):
+    """The kind of the position of the cursor and what precedes it.
+
+    *kind* is one of ``CODE``, ``STRING``, ``COMMENT``, ``IMPORT_PATH``,
+    ``FROM_IMPORT`` and ``NEED_IMPORT``.  *statement* is the code of the
+    statement up to the cursor, with the contents of strings removed.
+    """
+    def __init__(self, kind, statement, context_string, import_path=None):
+        self.kind = kind
+        self.statement = statement
+        self.context_string = context_string
+        self.import_path = import_path
+
+    def is_code(self):
+        """True, if the cursor is not in a string or a comment.
+        """
+        return self.kind not in (STRING, COMMENT)
+
+    def in_import(self):
+        """True, if the cursor is in the names of an import statement.
+        """
+        return self.kind in (IMPORT_PATH, FROM_IMPORT)
+
+    def __repr__(self):
+        return 'CursorContext(%r, %r, %r)' % (self.kind, self.statement,
+                                              self.context_string)
+
+
+def scan(text, state, statement):
+    """Scans one line of code, returns the kind at its end.
+
+    state is a list of the open string quote or None and the bracket depth,
+    it is updated.  The code outside of strings is appended to statement.
+    """
+    position = 0
+    while position < len(text):
+        quote = state[0]
+        if quote:
+            match = STRING_ENDS[quote].search(text, position)
+            if match is None:
+                return STRING
+            position = match.end()
+            if match.group() == quote:
+                state[0] = None
+                statement.append(quote + quote)
+            elif position == len(text):
+                # a backslash continues the string on the next line
+                return STRING
+            continue
+        match = SPECIAL.search(text, position)
+        if match is None:
+            statement.append(text[position:])
+            break
+        statement.append(text[position:match.start()])
+        token = match.group()
+        position = match.end()
+        if token == '#':
+            return COMMENT
+        elif token in STRING_ENDS:
+            state[0] = token
+        elif token in '([{':
+            state[1] += 1
+            statement.append(token)
+        elif token in ')]}':
+            state[1] = max(state[1] - 1, 0)
+            statement.append(token)
+        elif token == ';' and state[1] == 0:
+            del statement[:]
+        else:
+            statement.append(token)
+    return STRING if state[0] else CODE
+
+
+def classify(statement, context_string):
+    """Returns the CursorContext of the code of a statement before the cursor.
+    """
+    words = WORDS.findall(statement)
+    if words and words[0] == 'import':
+        return CursorContext(IMPORT_PATH, statement, context_string)
+    if words and words[0] == 'from':
+        if len(words) >= 3 and words[2] == 'import':
+            return CursorContext(FROM_IMPORT, statement, context_string,
+                                 words[1])
+        if len(words) == 2 and statement[-1].isspace():
+            return CursorContext(NEED_IMPORT, statement, context_string)
+        if len(words) <= 2:
+            return CursorContext(IMPORT_PATH, statement, context_string)
+    return CursorContext(CODE, statement, context_string)
+
+
+def analyze(lines, linenumber, line, column):
+    """Returns the CursorContext of column in line, the line linenumber.
+
+    lines are the lines of the source, the cursor line is taken from line.
+    """
+    index = min(linenumber - 1, len(lines))
+    start = statement_start(lines, index, line)
+    state = [None, 0]
+    statement = []
+    for text in lines[start:index]:
+        kind = scan(text, state, statement)
+        if kind == STRING and state[0] in ('"', "'") and \
+                not text.endswith('\\'):
+            # an unterminated string ends with its line
+            state[0] = None
+        continued = (kind == STRING or state[1] or
+                     (kind == CODE and text.endswith('\\')))
+        if not continued:
+            del statement[:]
+        elif statement and statement[-1] == '\\':
+            statement[-1] = ' '
+        else:
+            statement.append(' ')
+    before = line[:column]
+    kind = scan(before, state, statement)
+    if kind != CODE:
+        return CursorContext(kind, ''.join(statement), '')
+    context_string = DOTTED_NAME.search(before).group()
+    if context_string.endswith('.'):
+        context_string = context_string[:-1]
+    return classify(''.join(statement).lstrip(), context_string)
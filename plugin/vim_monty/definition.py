@@ -0,0 +1,153 @@
+"""Resolves the name at the cursor to the place of its definition.
+
+The definitions found are cached per scope and name until the modules
+involved are parsed again, so jumping to the same names is cheap.  Names
+which can not be resolved in the buffer are looked up in the project index
+(see ``vim_monty.project_index``) if one is loaded with
+``load_project_index``.
+"""
+import os
+
+from logilab.astng.exceptions import InferenceError
+
+from vim_monty import cache
+from vim_monty import language_elements
+from vim_monty import prefix_index
+from vim_monty import project_index
+from vim_monty.cache import NodeCache
+from vim_monty.logger import log
+from vim_monty.module_index import mtime
+from vim_monty.source import PyModule
+from vim_monty.stats import STATS
+
+
+DEFINITIONS = NodeCache(max_entries=1000, name='definitions')
+
+# cached for names which are not defined in the buffer or its imports
+NOT_FOUND = 'not found'
+
+# the loaded project index and the modification time of its file
+PROJECT_INDEX = [None, None]
+
+
+def dotted_name(line, column):
+    """Returns the dotted name under the cursor, like ``os.path.join``.
+
+    The name ends with the identifier at column.
+    """
+    def is_name_character(character):
+        return character.isalnum() or character == '_'
+    start = column
+    while start > 0 and (is_name_character(line[start - 1]) or
+                         line[start - 1] == '.'):
+        start -= 1
+    end = column
+    while end < len(line) and is_name_character(line[end]):
+        end += 1
+    return line[start:end].strip('.')
+
+
+def follow_import(element):
+    """Returns the element imported by element, or element itself.
+    """
+    try:
+        if isinstance(element, language_elements.LeFrom):
+            return element.imported(element.name())
+        if isinstance(element, language_elements.LeImport):
+            return element.imported()
+    except (InferenceError, KeyError), exc:
+        log("Could not follow import: %r" % exc)
+    return element
+
+
+def resolve(scope, name):
+    """Returns the language element of the dotted name in scope, or None.
+    """
+    context_string, _, last_name = name.rpartition('.')
+    if context_string:
+        context = scope.lookup(context_string)
+        if context is scope:
+            return None
+        accessibles = context.bounded_accessibles()
+    else:
+        accessibles = scope.free_accessibles()
+    for accessible in prefix_index.matches(accessibles, last_name):
+        if accessible.name() == last_name:
+            return follow_import(accessible)
+    return None
+
+
+def location(element):
+    """Returns the (file, linenumber) of the definition of element.
+
+    The file is None for the definitions in the buffer.
+    """
+    astng_element = element.astng_element
+    path = astng_element.root().file
+    if not path or not os.path.isfile(path):
+        path = None
+    return path, max(astng_element.fromlineno or 1, 1)
+
+
+def load_project_index(root, index_file):
+    """Uses the stored project index of root to find unresolved names.
+    """
+    PROJECT_INDEX[:] = [project_index.ProjectIndex(root, index_file), None]
+
+
+def indexed_definition(name):
+    """Returns the (file, linenumber) of name found in the project index.
+
+    The index is loaded again when its file changed.
+    """
+    index, index_mtime = PROJECT_INDEX
+    if index is None:
+        return None
+    if mtime(index.index_file) != index_mtime:
+        index.load()
+        PROJECT_INDEX[1] = mtime(index.index_file)
+    definitions = index.find(name.split('.')[-1])
+    if not definitions:
+        return None
+    path, _, linenumber = definitions[0]
+    return path, linenumber
+
+
+def build_module(src, lineno, buffer_id=None):
+    """Returns the PyModule of src.
+
+    Unlike for a completion the line at the cursor is usually complete, so
+    it is kept unchanged, unless the source is broken.
+    """
+    return PyModule.by_source(src, lineno - 1, buffer_id, keep_line=True)
+
+
+def definition(src, line, lineno, column, buffer_id=None):
+    """Returns the (file, linenumber) of the definition of the name at column.
+
+    The file is None for definitions in src, the result is None if the
+    definition is not found.  Names not found in the scope are cached as
+    well, and looked up in the project index.
+    """
+    name = dotted_name(line, column)
+    if not name:
+        return None
+    with cache.LOCK, STATS.request('definition'):
+        with STATS.span('parse'):
+            module = build_module(src, lineno, buffer_id)
+        scope = module.scope(lineno)
+        result = DEFINITIONS.get(scope.astng_element, extra=name)
+        if result is None:
+            with STATS.span('lookup'):
+                element = resolve(scope, name)
+            if element is None or element.astng_element is None:
+                result = DEFINITIONS.set(scope.astng_element, NOT_FOUND,
+                                         extra=name)
+            else:
+                result = DEFINITIONS.set(scope.astng_element,
+                                         location(element),
+                                         depends_on=(element.astng_element,),
+                                         extra=name)
+        if result == NOT_FOUND:
+            return indexed_definition(name)
+        return result
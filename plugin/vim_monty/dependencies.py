@@ -0,0 +1,216 @@
+"""Invalidation of cached modules whose source files changed.
+
+The graph knows the source file of every module built by the astng manager
+and the modules imported by it.  When a file changes, its module and every
+module importing it (directly or through other modules) are dropped from
+the manager, and their parse generation is bumped so the caches of the
+plugin drop the values derived from them.  Other modules stay cached.
+
+The files are polled by their modification time on a background thread,
+so the completions do not wait for it, see ``GRAPH``.  The files of the
+installed libraries rarely change, they are polled less often.
+"""
+from distutils.sysconfig import get_python_lib
+import os
+import time
+from threading import Thread
+
+from logilab.astng.builder import MANAGER
+from logilab.astng.nodes import From, Import
+
+from vim_monty import cache
+from vim_monty import disk_cache
+from vim_monty.incremental import GENERATIONS
+from vim_monty.logger import log
+from vim_monty.module_index import mtime
+
+
+# GRAPH and its thread survive reload_submodules
+KEEP_ON_RELOAD = True
+
+LIBRARY_DIRECTORY_NAMES = ('site-packages', 'dist-packages')
+STANDARD_LIBRARY = os.path.join(get_python_lib(standard_lib=True), '')
+
+
+def is_library(filepath):
+    """True if filepath is in the standard library or an installed package.
+    """
+    filepath = os.path.abspath(filepath)
+    if filepath.startswith(STANDARD_LIBRARY):
+        return True
+    return any(name in LIBRARY_DIRECTORY_NAMES
+               for name in filepath.split(os.sep))
+
+
+def imported_names(module):
+    """Returns the absolute names of the modules imported by module.
+
+    The name of an imported member is included too, as it may be a
+    submodule.  Imports which may be implicit relative imports are included
+    with both names.
+    """
+    names = set()
+    for node in module.nodes_of_class((Import, From)):
+        if isinstance(node, Import):
+            for name, _ in node.names:
+                parts = name.split('.')
+                names.update('.'.join(parts[:index + 1])
+                             for index in range(len(parts)))
+            continue
+        modnames = set()
+        if not node.level:
+            modnames.add(node.modname)
+        try:
+            modnames.add(module.relative_to_absolute_name(node.modname,
+                                                          node.level))
+        except Exception:
+            pass
+        for modname in modnames:
+            names.add(modname)
+            names.update('%s.%s' % (modname, name)
+                         for name, _ in node.names if name != '*')
+    return names
+
+
+class DependencyGraph(object):
+    """The import relations of the modules cached by the astng manager.
+
+    The files are checked at most every ``CHECK_INTERVAL`` seconds, the
+    files of libraries (see ``is_library``) every ``LIBRARY_INTERVAL``
+    seconds.
+    """
+    CHECK_INTERVAL = 2
+    LIBRARY_INTERVAL = 60
+
+    def __init__(self, manager=MANAGER):
+        self.manager = manager
+        self._modules = {}
+        self._imports = {}
+        self._importers = {}
+        self._last_check = 0
+        self._last_library_check = 0
+        self._thread = None
+
+    def importers(self, modname):
+        """Returns the names of the tracked modules importing modname.
+        """
+        return set(self._importers.get(modname, ()))
+
+    def track(self, module):
+        """Records the source file state and the imports of module.
+
+        The imports recorded for an older module of the same name are
+        replaced.
+        """
+        filepath = module.file
+        self._modules[module.name] = (module, filepath, mtime(filepath),
+                                      is_library(filepath))
+        self._untrack_imports(module.name)
+        imports = imported_names(module)
+        self._imports[module.name] = imports
+        for imported in imports:
+            self._importers.setdefault(imported, set()).add(module.name)
+
+    def _untrack_imports(self, modname):
+        """Forgets the imports recorded for the module modname.
+        """
+        for imported in self._imports.pop(modname, ()):
+            importers = self._importers.get(imported)
+            if importers is not None:
+                importers.discard(modname)
+                if not importers:
+                    del self._importers[imported]
+
+    def update(self):
+        """Tracks the modules the manager built since the last update.
+        """
+        for modname, module in self.manager.astng_cache.items():
+            if not modname or not getattr(module, 'file', None) or \
+               not module.file.endswith('.py'):
+                continue
+            tracked = self._modules.get(modname)
+            if tracked is None or tracked[0] is not module:
+                self.track(module)
+
+    def changed(self, libraries=True):
+        """Returns the names of the tracked modules whose file changed.
+
+        The files of libraries are only compared if libraries is true.
+        """
+        return [modname
+                for modname, (_, filepath, file_mtime, library)
+                in self._modules.items()
+                if (libraries or not library) and
+                mtime(filepath) != file_mtime]
+
+    def dependents(self, modnames):
+        """Returns modnames and the names of all modules importing them.
+        """
+        result = set()
+        pending = list(modnames)
+        while pending:
+            modname = pending.pop()
+            if modname in result:
+                continue
+            result.add(modname)
+            pending.extend(self._importers.get(modname, ()))
+        return result
+
+    def invalidate(self, modnames):
+        """Drops the given modules and their importers from the caches.
+
+        Returns the names of the dropped modules.
+        """
+        invalid = self.dependents(modnames)
+        for modname in invalid:
+            self._untrack_imports(modname)
+            tracked = self._modules.pop(modname, None)
+            if tracked is None:
+                continue
+            module, filepath, _, _ = tracked
+            module.monty_generation = GENERATIONS.next()
+            if self.manager.astng_cache.get(modname) is module:
+                del self.manager.astng_cache[modname]
+            disk_cache.forget(filepath)
+        return invalid
+
+    def check(self, force=False):
+        """Invalidates the modules whose files changed since the last check.
+
+        Returns the names of the dropped modules.  The files are compared
+        without holding the lock of the analysis state.
+        """
+        now = time.time()
+        if not force and now - self._last_check < self.CHECK_INTERVAL:
+            return set()
+        self._last_check = now
+        libraries = now - self._last_library_check >= self.LIBRARY_INTERVAL
+        if libraries:
+            self._last_library_check = now
+        self.update()
+        changed = self.changed(libraries)
+        if not changed:
+            return set()
+        with cache.LOCK:
+            return self.invalidate(changed)
+
+    def start(self):
+        """Checks the files every ``CHECK_INTERVAL`` seconds in a thread.
+        """
+        if self._thread is None or not self._thread.isAlive():
+            self._thread = Thread(target=self._work)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _work(self):
+        """The loop of the background thread.
+        """
+        while True:
+            time.sleep(self.CHECK_INTERVAL)
+            try:
+                self.check(force=True)
+            except Exception, exc:
+                log("Dependency check failed: %r" % exc)
+
+
+GRAPH = DependencyGraph()
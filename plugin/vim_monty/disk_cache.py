@@ -0,0 +1,220 @@
+"""Persistent cache of astng modules built from python source files.
+
+Building the astng of big libraries takes a while and has to be done again
+in every Vim session.  ``configure`` a directory to store every module built
+by the astng manager on disk, the manager is only patched then.  A cache
+file is only used while the size and the modification time of the source
+file are unchanged.
+"""
+import cPickle
+from cStringIO import StringIO
+import hashlib
+import os
+import zlib
+
+from logilab.astng import bases
+from logilab.astng.builder import MANAGER
+from logilab.astng.scoped_nodes import Class, Function, Module
+from logilab.common.modutils import NoSourceFile, get_source_file
+
+from vim_monty.logger import log
+
+
+DIRECTORY = None
+
+FORMAT_VERSION = 2
+
+
+def _proxy_setstate(self, state):
+    """Sets the state of a unpickled proxy without using its __getattr__.
+
+    Without this the unpickling of astng Const nodes ends in an endless
+    recursion, because the proxied object is looked up on the empty instance.
+    """
+    self.__dict__.update(state)
+
+
+def scope_path(node):
+    """Returns the names of the scopes from the module down to node.
+
+    None if looking them up in the module does not return node, like for
+    redefined names.
+    """
+    names = []
+    scope = node
+    while scope.parent is not None:
+        names.append(scope.name)
+        scope = scope.parent.frame()
+    names.reverse()
+    try:
+        for name in names:
+            scope = scope[name]
+    except KeyError:
+        return None
+    return tuple(names) if scope is node else None
+
+
+def file_key(filepath):
+    """Returns the key of the current state of the given file.
+    """
+    stat = os.stat(filepath)
+    return (FORMAT_VERSION, os.path.abspath(filepath), stat.st_mtime,
+            stat.st_size)
+
+
+class ModuleCache(object):
+    """Stores astng modules in a directory.
+
+    Every module is stored in its own file, the key of the source file state
+    is stored before the compressed module, so a stale file is detected
+    without unpickling the module.  References to other modules, and to
+    their classes and functions, are stored by name and loaded through the
+    astng manager.
+    """
+    def __init__(self, directory, manager=MANAGER):
+        self.directory = directory
+        self.manager = manager
+        bases.Proxy.__setstate__ = _proxy_setstate
+
+    def cache_file(self, filepath):
+        """Returns the cache file path for the given source file.
+        """
+        digest = hashlib.sha1(os.path.abspath(filepath)).hexdigest()
+        return os.path.join(self.directory, digest + '.astng')
+
+    def load(self, filepath, modname):
+        """Returns the cached module of the given file or None.
+        """
+        try:
+            cache_file = open(self.cache_file(filepath), 'rb')
+        except IOError:
+            return None
+        try:
+            try:
+                if cPickle.load(cache_file) != (file_key(filepath), modname):
+                    return None
+                data = zlib.decompress(cache_file.read())
+            finally:
+                cache_file.close()
+            unpickler = cPickle.Unpickler(StringIO(data))
+            unpickler.persistent_load = self._load_reference
+            return unpickler.load()
+        except Exception, exc:
+            log("Could not load %s from the cache: %r" % (modname, exc))
+            return None
+
+    def store(self, filepath, module):
+        """Stores the module built from the given file.
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        cache_file_path = self.cache_file(filepath)
+        tmp_file_path = '%s.%d.tmp' % (cache_file_path, os.getpid())
+        try:
+            data = StringIO()
+            pickler = cPickle.Pickler(data, cPickle.HIGHEST_PROTOCOL)
+            pickler.persistent_id = lambda obj: self._reference(obj, module)
+            pickler.dump(module)
+            cache_file = open(tmp_file_path, 'wb')
+            try:
+                cPickle.dump((file_key(filepath), module.name), cache_file,
+                             cPickle.HIGHEST_PROTOCOL)
+                cache_file.write(zlib.compress(data.getvalue()))
+            finally:
+                cache_file.close()
+            os.rename(tmp_file_path, cache_file_path)
+        except Exception, exc:
+            log("Could not store %s in the cache: %r" % (module.name, exc))
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+
+    def remove(self, filepath):
+        """Removes the cached module of the given file.
+        """
+        try:
+            os.remove(self.cache_file(filepath))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _reference(obj, module):
+        """Returns the reference of nodes of other modules to store them by.
+
+        Modules are referenced by their name, their classes and functions by
+        the module name and their ``scope_path``.
+        """
+        if isinstance(obj, Module):
+            if obj is not module and obj.name:
+                return obj.name
+        elif isinstance(obj, (Class, Function)):
+            root = obj.root()
+            if root is not module and root.name:
+                path = scope_path(obj)
+                if path is not None:
+                    return (root.name,) + path
+        return None
+
+    def _load_reference(self, reference):
+        """Loads a module or a node of it referenced by the stored module.
+        """
+        if isinstance(reference, basestring):
+            return self.manager.astng_from_module_name(reference)
+        node = self.manager.astng_from_module_name(reference[0])
+        for name in reference[1:]:
+            node = node[name]
+        return node
+
+
+def forget(filepath):
+    """Removes the cached module of the given file, if caching is enabled.
+
+    Needed when a module has to be built again although its file did not
+    change, e.g. because a module it imports with ``*`` changed.
+    """
+    if DIRECTORY and filepath:
+        try:
+            source_path = get_source_file(filepath, include_no_ext=True)
+        except NoSourceFile:
+            return
+        ModuleCache(DIRECTORY).remove(source_path)
+
+
+def configure(directory, manager=MANAGER):
+    """Stores the modules built by the manager in directory.
+
+    The manager is patched with the first directory, None disables the
+    cache again.
+    """
+    global DIRECTORY
+    DIRECTORY = directory
+    if directory and 'astng_from_file' not in manager.__dict__:
+        install(manager)
+
+
+def install(manager=MANAGER):
+    """Routes the source file builds of the manager through the cache.
+
+    The astng manager is a borg, so this affects every manager instance.
+    """
+    bases.Proxy.__setstate__ = _proxy_setstate
+    build_from_file = manager.__class__.astng_from_file.__get__(manager)
+
+    def astng_from_file(filepath, modname=None, fallback=True, source=False):
+        """Like ASTNGManager.astng_from_file, but uses the disk cache.
+        """
+        if not DIRECTORY or modname is None or modname in manager.astng_cache:
+            return build_from_file(filepath, modname, fallback, source)
+        try:
+            source_path = get_source_file(filepath, include_no_ext=True)
+        except NoSourceFile:
+            return build_from_file(filepath, modname, fallback, source)
+        cache = ModuleCache(DIRECTORY, manager)
+        module = cache.load(source_path, modname)
+        if module is not None:
+            manager.astng_cache[modname] = module
+            return module
+        module = build_from_file(filepath, modname, fallback, source)
+        cache.store(source_path, module)
+        return module
+
+    manager.astng_from_file = astng_from_file
@@ -0,0 +1,243 @@
+"""Incremental building of astng modules for buffers under edit.
+
+Between two completion requests usually only a few lines of a buffer change.
+The ``IncrementalBuilder`` remembers the last astng module of every buffer and
+re-parses only the top level statements touched by the change.  The new nodes
+are spliced into the cached module, so everything else (scopes, lookups,
+inference) works on a module like a fresh one.
+"""
+import itertools
+
+from logilab.astng.builder import ASTNGBuilder
+from logilab.astng.nodes import Name
+
+from vim_monty.logger import log
+from vim_monty.snapshot import changed_range
+
+
+GENERATIONS = itertools.count(1)
+
+LINE_ATTRIBUTES = ('lineno', 'fromlineno', 'tolineno', 'blockstart_tolineno')
+
+
+def generation(astng_element):
+    """Returns the parse generation of the module of the given element.
+
+    Every build or incremental update of a module gets a new generation, so
+    the generation can be used to invalidate data derived from a module.
+    """
+    return getattr(astng_element.root(), 'monty_generation', 0)
+
+
+def statement_start(statement):
+    """Returns the first line of a top level statement.
+
+    Returns None if the line can not be trusted, like for multi line strings
+    where python reports the last line of the string.
+    """
+    if statement.col_offset != 0:
+        return None
+    return statement.lineno
+
+
+def shift_lines(astng_element, offset):
+    """Moves the given element and all its children by offset lines.
+    """
+    for attribute in LINE_ATTRIBUTES:
+        value = astng_element.__dict__.get(attribute)
+        if value is not None:
+            setattr(astng_element, attribute, value + offset)
+    for child in astng_element.get_children():
+        shift_lines(child, offset)
+
+
+def top_statement(astng_element, module):
+    """Returns the top level statement of module containing astng_element.
+    """
+    while (astng_element.parent is not None and
+           astng_element.parent is not module):
+        astng_element = astng_element.parent
+    return astng_element
+
+
+class UnregisteredBuilder(ASTNGBuilder):
+    """An astng builder whose string builds are not stored in the manager.
+
+    The blocks of an incremental update are parsed with the name of their
+    module, they must not replace the module in the astng cache.
+    """
+    def string_build(self, data, modname='', path=None):
+        """Builds the astng of the source code data, like ASTNGBuilder.
+        """
+        module = self._data_build(data, modname, path)
+        for from_node in module._from_nodes:
+            self.add_from_names_to_locals(from_node)
+        for delayed in module._delayed_assattr:
+            self.delayed_assattr(delayed)
+        if modname:
+            for transformer in self._manager.transformers:
+                transformer(module)
+        return module
+
+
+def is_self_assattr(assattr):
+    """True if the attribute assignment is on the first argument of a method.
+
+    Only such assignments are known to stay inside of their top level
+    statement when the builder handles the delayed attribute assignments.
+    """
+    args = getattr(assattr.frame(), 'args', None)
+    if args is None or not args.args or not isinstance(assattr.expr, Name):
+        return False
+    return assattr.expr.name == getattr(args.args[0], 'name', None)
+
+
+class IncrementalBuilder(object):
+    """Builds astng modules from source lines, reusing the previous build.
+
+    The previous build is remembered per key (like a buffer number).  Builds
+    without a key are always full builds.  A build failing on broken source
+    code keeps the remembered build.
+    """
+    MAX_BUFFERS = 16
+
+    def __init__(self, builder=None):
+        self.builder = builder or ASTNGBuilder()
+        self.block_builder = UnregisteredBuilder()
+        self._buffers = {}
+
+    def build(self, source_lines, key=None):
+        """Returns the astng module of the given source lines.
+
+        Raises the same exceptions as a full build on broken source code.
+        """
+        module = None
+        if key is not None and key in self._buffers:
+            old_lines, old_module = self._buffers[key]
+            try:
+                module = self.update(old_lines, old_module, source_lines)
+            except SyntaxError:
+                # the changed statements do not parse, neither does the
+                # complete source
+                raise
+            except Exception, exc:
+                log("Incremental build failed: %r" % exc)
+                del self._buffers[key]
+                module = None
+        if module is None:
+            module = self.full_build(source_lines)
+        if key is not None:
+            self.remember(key, source_lines, module)
+        return module
+
+    def full_build(self, source_lines):
+        """Builds a new module of the complete source lines.
+        """
+        module = self.builder.string_build('\n'.join(source_lines))
+        module.monty_generation = GENERATIONS.next()
+        return module
+
+    def remember(self, key, source_lines, module):
+        """Stores the state of a build for the next build with this key.
+        """
+        if key not in self._buffers and len(self._buffers) >= self.MAX_BUFFERS:
+            self._buffers.popitem()
+        self._buffers[key] = (list(source_lines), module)
+
+    def forget(self, key):
+        """Drops the remembered build of the given key.
+        """
+        self._buffers.pop(key, None)
+
+    def update(self, old_lines, module, new_lines):
+        """Updates module (built of old_lines) to represent new_lines.
+
+        Returns the updated module, or None if a full build is needed.
+        """
+        changed = changed_range(old_lines, new_lines)
+        if changed is None:
+            return module
+        # first changed line and last changed line (old lines, one based):
+        changed_from = changed[0] + 1
+        changed_to = max(changed[1], changed_from)
+
+        starts = [statement_start(statement) for statement in module.body]
+        if not starts or None in starts or starts[0] > changed_from:
+            return None
+        first_index = last_index = 0
+        for index, start in enumerate(starts):
+            if start <= changed_from:
+                first_index = index
+            if start <= changed_to:
+                last_index = index
+        offset = len(new_lines) - len(old_lines)
+        block_from = starts[first_index]
+        if last_index + 1 < len(starts):
+            block_to = starts[last_index + 1] + offset
+        else:
+            block_to = len(new_lines) + 1
+        old_statements = module.body[first_index:last_index + 1]
+        block = self.block_builder.string_build(
+            '\n'.join(new_lines[block_from - 1:block_to - 1]), module.name)
+        if not self._can_splice(module, old_statements, block):
+            return None
+        self._splice(module, first_index, last_index, block,
+                     block_from - 1, offset)
+        return module
+
+    @staticmethod
+    def _can_splice(module, old_statements, block):
+        """True if replacing old_statements by block keeps module consistent.
+
+        Attribute assignments which are not on ``self`` may have changed
+        elements of other top level statements.
+        """
+        old_statement_ids = set(id(statement) for statement in old_statements)
+        for assattr in getattr(module, '_delayed_assattr', ()):
+            if (id(top_statement(assattr, module)) in old_statement_ids and
+                not is_self_assattr(assattr)):
+                return False
+        for assattr in block._delayed_assattr:
+            if not is_self_assattr(assattr):
+                return False
+        return True
+
+    @staticmethod
+    def _splice(module, first_index, last_index, block, line_offset,
+                following_offset):
+        """Replaces the statements first_index to last_index by block.
+        """
+        old_statement_ids = set(id(statement) for statement
+                                in module.body[first_index:last_index + 1])
+        def is_kept(astng_element):
+            """True if the element is not part of a replaced statement.
+            """
+            return id(top_statement(astng_element, module)) not in \
+                old_statement_ids
+
+        following = module.body[last_index + 1:]
+        if following_offset:
+            for statement in following:
+                shift_lines(statement, following_offset)
+        for statement in block.body:
+            shift_lines(statement, line_offset)
+            statement.parent = module
+        module.body = module.body[:first_index] + block.body + following
+
+        for name, astng_elements in module.locals.items():
+            kept = [element for element in astng_elements if is_kept(element)]
+            if kept:
+                module.locals[name] = kept
+            else:
+                del module.locals[name]
+        for name, astng_elements in block.locals.iteritems():
+            merged = module.locals.setdefault(name, [])
+            merged.extend(astng_elements)
+            merged.sort(key=lambda element: element.fromlineno)
+        for attribute in ('_from_nodes', '_delayed_assattr'):
+            kept = [element for element in getattr(module, attribute, ())
+                    if is_kept(element)]
+            setattr(module, attribute, kept + getattr(block, attribute))
+
+        module.set_line_info(module.last_child())
+        module.monty_generation = GENERATIONS.next()
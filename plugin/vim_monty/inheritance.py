@@ -0,0 +1,94 @@
+"""Resolution of class members along the method resolution order.
+
+The members of a class and all its base classes are collected once into a
+``MemberIndex``, which is cached until one of the defining modules changes.
+"""
+from collections import OrderedDict
+
+from logilab.astng.exceptions import InferenceError
+
+from vim_monty.cache import NodeCache
+
+
+MEMBER_INDEXES = NodeCache(max_entries=500, name='member_indexes')
+
+
+def direct_bases(klass):
+    """Returns the inferred astng classes of the bases of klass.
+    """
+    try:
+        return list(klass.ancestors(recurs=False))
+    except InferenceError:
+        return []
+
+
+def c3_merge(sequences):
+    """Merges the class sequences like the C3 linearization does.
+
+    Returns None if there is no consistent order.
+    """
+    result = []
+    sequences = [list(sequence) for sequence in sequences if sequence]
+    while sequences:
+        for sequence in sequences:
+            head = sequence[0]
+            if not [other for other in sequences if head in other[1:]]:
+                break
+        else:
+            return None
+        result.append(head)
+        for sequence in sequences:
+            if sequence[0] is head:
+                del sequence[0]
+        sequences = [sequence for sequence in sequences if sequence]
+    return result
+
+
+def mro(klass, _visiting=()):
+    """Returns the method resolution order of the astng class klass.
+
+    Falls back to a depth first order if the bases are inconsistent. The
+    orders of the bases are taken from their cached member indexes.
+    """
+    if klass in _visiting:
+        return [klass]
+    visiting = _visiting + (klass,)
+    bases = direct_bases(klass)
+    base_mros = [member_index(base, visiting).mro for base in bases]
+    merged = c3_merge(base_mros + [bases])
+    if merged is None:
+        merged = []
+        for base_mro in base_mros:
+            for ancestor in base_mro:
+                if ancestor not in merged:
+                    merged.append(ancestor)
+    return [klass] + merged
+
+
+class MemberIndex(object):
+    """The members of a class, including the inherited ones.
+
+    ``members`` and ``instance_attributes`` map every name to a tuple of the
+    defining astng element and the class defining it.
+    """
+    def __init__(self, klass, _visiting=()):
+        self.mro = mro(klass, _visiting)
+        self.members = OrderedDict()
+        self.instance_attributes = OrderedDict()
+        for a_class in self.mro:
+            for name, astng_element in a_class.items():
+                if name not in self.members:
+                    self.members[name] = (astng_element, a_class)
+            for name, values in a_class.instance_attrs.iteritems():
+                if name not in self.instance_attributes:
+                    self.instance_attributes[name] = (values[0], a_class)
+
+
+def member_index(klass, _visiting=()):
+    """Returns the cached member index of the astng class klass.
+    """
+    index = MEMBER_INDEXES.get(klass)
+    if index is None:
+        index = MemberIndex(klass, _visiting)
+        MEMBER_INDEXES.set(klass, index, depends_on=index.mro)
+    return index
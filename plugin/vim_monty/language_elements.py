@@ -2,10 +2,41 @@
 
 The classes contain some analytic methods used on completion.
 """
+from logilab.astng.bases import InferenceContext
+from logilab.astng.builder import MANAGER
 from logilab.astng.exceptions import InferenceError
+from logilab.common.compat import builtins
 
 from vim_monty import completionable
+from vim_monty import inheritance
+from vim_monty import module_index
+from vim_monty import prefix_index
+from vim_monty.cache import NodeCache
 from vim_monty.logger import log
+from vim_monty.stats import STATS
+
+
+ENCLOSING_ACCESSIBLES = NodeCache(max_entries=100,
+                                  name='enclosing_accessibles')
+MODULE_INDEXES = NodeCache(max_entries=100, name='module_indexes')
+IMPORTED = NodeCache(max_entries=1000, name='imported')
+INFERRED = NodeCache(max_entries=5000, max_weight=200000,
+                     weigh=lambda element: node_lines(element.astng_element),
+                     name='inferred')
+
+
+def node_lines(astng_element):
+    """Returns the number of source lines of astng_element, at least 1.
+
+    An estimate of the nodes an inference result keeps alive, a cached
+    module or class keeps all of its nodes.
+    """
+    try:
+        # modules start at line 0
+        first_line = astng_element.fromlineno or 1
+        return max(astng_element.tolineno - first_line + 1, 1)
+    except (AttributeError, TypeError):
+        return 1
 
 
 def reload_submodules():
@@ -13,12 +44,23 @@ def reload_submodules():
     """
     for name, value in globals().iteritems():
         if(not name.startswith('__') and not name.endswith('__') and
-           value.__class__.__name__ == 'module'):
+           value.__class__.__name__ == 'module' and
+           not getattr(value, 'KEEP_ON_RELOAD', False)):
             if hasattr(value, 'reload_submodules'):
                 value.reload_submodules()
             reload(value)
 
 
+def builtins_module():
+    """Returns the astng module of the builtins.
+
+    astng builds this module itself when it is imported, so it is only looked
+    up on first use instead of building another one on import of this module.
+    Every process builds it once, the Vim instances do not share it.
+    """
+    return MANAGER.astng_from_module_name(builtins.__name__)
+
+
 def le_class_name(astng_element):
     """Returns the name of the special implementation class.
     """
@@ -31,6 +73,8 @@ class LanguageElement(completionable.Completionable):
     This module contains some special implementations of this class for some
     language elements like ``LeClass`` for classes.
     """
+    __slots__ = ('astng_element', 'context_string')
+
     def __init__(self, astng_element, context_string="", name=None):
         super(LanguageElement, self).__init__(name)
         self.astng_element = astng_element
@@ -95,7 +139,22 @@ class LanguageElement(completionable.Completionable):
         for name, accessible in self.astng_element.items():
             accessibles.append(LanguageElement.create(accessible, name=name,
                                             context_string=self.context_string))
-        return accessibles + self.parent().free_accessibles()
+        return accessibles + self.parent().enclosing_accessibles()
+
+    def enclosing_accessibles(self):
+        """Return the free accessibles of this element for an inner scope.
+
+        The enclosing scopes rarely change while editing, so their accessibles
+        are cached per scope and parse generation.  Only the innermost scope
+        is calculated on every request.
+        """
+        accessibles = ENCLOSING_ACCESSIBLES.get(self.astng_element,
+                                                extra=self.context_string)
+        if accessibles is None:
+            accessibles = ENCLOSING_ACCESSIBLES.set(self.astng_element,
+                                                    self.free_accessibles(),
+                                                    extra=self.context_string)
+        return list(accessibles)
 
     def name(self):
         """Returns the name of this element.
@@ -111,9 +170,14 @@ class LanguageElement(completionable.Completionable):
 class LeNoneType(LanguageElement):
     """Language element if the element can not be found.
     """
+    __slots__ = ()
+
     def free_accessibles(self):
         return []
 
+    def enclosing_accessibles(self):
+        return []
+
     def bounded_accessibles(self):
         return []
 
@@ -121,15 +185,28 @@ class LeNoneType(LanguageElement):
 class LeModule(LanguageElement):
     """This language element represent a python module.
     """
+    __slots__ = ()
     KIND = 'm'
 
     def bounded_accessibles(self):
-        return self.free_accessibles()
+        """Returns the module names, cached per module.
+
+        Big modules are returned as a ``PrefixIndex``.
+        """
+        index = MODULE_INDEXES.get(self.astng_element,
+                                   extra=self.context_string)
+        if index is None:
+            index = MODULE_INDEXES.set(
+                self.astng_element,
+                prefix_index.index(self.free_accessibles()),
+                extra=self.context_string)
+        return index
 
 
 class LeImport(LanguageElement):
     """This language element represent a python import command.
     """
+    __slots__ = ()
     KIND = 'm'
 
     def import_path(self):
@@ -151,22 +228,68 @@ class LeImport(LanguageElement):
 class LeFrom(LanguageElement):
     """This language element represent a element imported with from
     """
+    __slots__ = ()
+
     def complex_name(self):
         try:
             imported = self.imported(self.name())
             return imported.complex_name()
-        except InferenceError:
+        except (InferenceError, KeyError):
             return self.name()
 
     def kind(self):
-        imported = self.imported(self.name())
-        return imported.kind()
+        try:
+            imported = self.imported(self.name())
+            return imported.kind()
+        except (InferenceError, KeyError):
+            return self.KIND
+
+    def is_deferred(self):
+        try:
+            return self._cached((self.name(), self.context_string)) is None
+        except InferenceError:
+            return False
 
     def imported(self, name=None):
         """Returns the imported language element.
+
+        The imported elements are cached per import target.  A failed import
+        is cached as well, until the module index changes, and raises an
+        ``InferenceError`` again.
         """
         if not name:
             name = self.context_string.split('.')[-1]
+        key = (name, self.context_string)
+        imported = self._cached(key)
+        if imported is None:
+            try:
+                imported = self._import(name)
+            except (InferenceError, KeyError), exc:
+                IMPORTED.set(self.astng_element,
+                             (repr(exc), module_index.INDEX.version),
+                             extra=key)
+                raise
+            IMPORTED.set(self.astng_element, imported,
+                         depends_on=(imported.astng_element,), extra=key)
+        return imported
+
+    def _cached(self, key):
+        """Returns the cached import of key, or None if it is not cached.
+
+        Raises an ``InferenceError`` if the import failed with the current
+        module index.
+        """
+        imported = IMPORTED.get(self.astng_element, extra=key)
+        if isinstance(imported, tuple):
+            message, version = imported
+            if version == module_index.INDEX.version:
+                raise InferenceError(message)
+            return None
+        return imported
+
+    def _import(self, name):
+        """Imports the element name from the module of this element.
+        """
         module_name = self.astng_element.modname
         try:
             import_path = module_name + '.' + name
@@ -179,6 +302,7 @@ class LeFrom(LanguageElement):
                 astng_element = imported_module[self.name()]
         return LanguageElement.create(astng_element, name=name,
                                       context_string=self.context_string)
+
     def bounded_accessibles(self):
         return self.imported().bounded_accessibles()
 
@@ -186,46 +310,34 @@ class LeFrom(LanguageElement):
 class LeClass(LanguageElement):
     """Language element of class elements.
     """
+    __slots__ = ()
     KIND = 'c'
 
-    def __init__(self, *args, **kwargs):
-        super(LeClass, self).__init__(*args, **kwargs)
-        self._bases = None
-
     def complex_name(self):
         # TODO add constructor arguments here:
         return self.name() + '('
 
     def free_accessibles(self):
-        return self.parent().free_accessibles()
+        return self.parent().enclosing_accessibles()
 
-    def base_classes(self):
-        """Returns language elements of base classes of this class.
+    def member_index(self):
+        """Returns the index of the members of this class and its bases.
         """
-        if self._bases is None:
-            self._bases = [LanguageElement.create(base,
-                                             context_string=self.context_string)
-                           for base in self.astng_element.bases]
-        return self._bases
+        return inheritance.member_index(self.astng_element)
 
     def bounded_accessibles(self):
-        result = set(LanguageElement.create(astng_element, name=name,
-                                            context_string=self.context_string)
-                     for name, astng_element in self.astng_element.items())
-        for base_class in self.base_classes():
-            result.update(base_class.bounded_accessibles())
-        return list(result)
+        return [LanguageElement.create(astng_element, name=name,
+                                       context_string=self.context_string)
+                for name, (astng_element, _class)
+                in self.member_index().members.iteritems()]
 
     def instance_attributes(self):
         """Returns the instance attributes of this class.
         """
-        result = set()
-        for name, values in self.astng_element.instance_attrs.iteritems():
-            result.add(LanguageElement.create(values[0], name=name,
-                                            context_string=self.context_string))
-        for base_class in self.base_classes():
-            result.update(base_class.instance_attributes())
-        return list(result)
+        return [LanguageElement.create(astng_element, name=name,
+                                       context_string=self.context_string)
+                for name, (astng_element, _class)
+                in self.member_index().instance_attributes.iteritems()]
 
     def bounded_accessibles_instance(self):
         """Returns the bounded accessible of a instance of this class.
@@ -236,6 +348,7 @@ class LeClass(LanguageElement):
 class LeFunction(LanguageElement):
     """This language element represent a python function or method.
     """
+    __slots__ = ()
     KIND = 'f'
 
     def complex_name(self):
@@ -245,10 +358,25 @@ class LeFunction(LanguageElement):
 class LeInstance(LanguageElement):
     """This language element represent a class instantiation.
     """
+    __slots__ = ()
     KIND = 'i'
 
     def get_class(self):
         """Returns the language element of the class for this instance.
+
+        The result is cached per instance and parse generation.
+        """
+        the_class = INFERRED.get(self.astng_element,
+                                 extra=('class', self.context_string))
+        if the_class is None:
+            the_class = self._get_class()
+            INFERRED.set(self.astng_element, the_class,
+                         depends_on=(the_class.astng_element,),
+                         extra=('class', self.context_string))
+        return the_class
+
+    def _get_class(self):
+        """Looks up the class of this instance.
         """
         class_name = self.astng_element.pytype()
         if class_name[0] == '.':
@@ -269,16 +397,14 @@ class LeConst(LanguageElement):
 
     At this point I think this can only be a builtin.
     """
-    from logilab.astng.builder import ASTNGBuilder
-    from logilab.common.compat import builtins
-    BUILTINS = ASTNGBuilder().inspect_build(builtins)
+    __slots__ = ()
     KIND = 'b'
 
     def bounded_accessibles(self):
         name = self.astng_element.pytype()
         if name.startswith('__builtin__'):
             name = name.split('.')[-1]
-            builtin_astng_element = self.BUILTINS[name]
+            builtin_astng_element = builtins_module()[name]
             element = LanguageElement.create(builtin_astng_element, name=name,
                                              context_string=self.context_string)
             return element.bounded_accessibles()
@@ -289,17 +415,31 @@ class LeConst(LanguageElement):
 class LeName(LanguageElement):
     """This is simply a python variable.
     """
+    __slots__ = ()
     KIND = 'v'
 
     def infer(self):
         """Find a more specific representation of the variable content.
+
+        The result is cached per name and parse generation of the modules
+        passed by the inference.
         """
-        infereds = self.astng_element.infered()
+        infered = INFERRED.get(self.astng_element, extra=self.context_string)
+        if infered is not None:
+            return infered
+        context = InferenceContext()
+        with STATS.span('inference'):
+            infereds = list(self.astng_element.infer(context))
         if infereds:
-            return LanguageElement.create(infereds[0],
-                                          context_string=self.context_string)
+            infered = LanguageElement.create(infereds[0],
+                                             context_string=self.context_string)
+            passed = tuple(node for node, _ in context.path)
+            return INFERRED.set(self.astng_element, infered,
+                                depends_on=(infereds[0],) + passed,
+                                extra=self.context_string)
         log("Could not infer name: %s" % self.name())
-        return LeNoneType(None)
+        return INFERRED.set(self.astng_element, LeNoneType(None),
+                            extra=self.context_string)
     
     def bounded_accessibles(self):
         return self.infer().bounded_accessibles()
@@ -313,9 +453,11 @@ class LeName(LanguageElement):
 class LeAssName(LeName):
     """This is like 'LeName' but represent a variable assignment.
     """
+    __slots__ = ()
 
 
 class LeAssAttr(LeName):
     """A argument of a function.
     """
+    __slots__ = ()
     KIND = 'a'
@@ -13,3 +13,13 @@ def log(msg):
             msg = repr(msg)
         logfile.write(msg + '\n')
         logfile.close()
+
+
+def output_file():
+    """Returns a new file for the output of a child process.
+
+    This is the log file if logging is enabled, else the null device.
+    """
+    if ENABLED:
+        return open(LOGFILE, 'a')
+    return open(os.devnull, 'w')
@@ -0,0 +1,157 @@
+"""An in-memory index of the python modules and packages on the disk.
+
+Listing directories is slow on network file systems, so the modules of a
+directory are listed once and kept.  A background thread indexes the
+``sys.path`` directories once, and then rescans the listed directories
+whose modification time changed.  See ``INDEX``.
+"""
+import os
+import sys
+import time
+from threading import RLock, Thread
+
+from vim_monty.logger import log
+
+
+# INDEX and its thread survive reload_submodules
+KEEP_ON_RELOAD = True
+
+MODULE_EXTENSIONS = ('.py', '.pyc', '.pyo', '.pyw')
+
+
+def is_module_or_package(module_path):
+    """Is the given path a python module or package.
+
+    Returns the module name if it is a module or a package, else None.
+    """
+    module_file = os.path.basename(module_path)
+    module_name, extension = os.path.splitext(module_file)
+    if os.path.isdir(module_path):
+        for module_extension in MODULE_EXTENSIONS:
+            if '__init__' + module_extension in os.listdir(module_path):
+                return module_name
+    else:
+        if module_name != '__init__' and extension in MODULE_EXTENSIONS:
+            return module_name
+    return None
+
+
+def mtime(path):
+    """Returns the modification time of path, or None if it does not exist.
+    """
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class DirectoryEntry(object):
+    """The modules of one directory and the state they were listed in.
+
+    Only the modification time of the directory itself is compared, so a
+    sub directory which becomes a package is found with the next change of
+    the directory.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.mtime = mtime(directory)
+        self.modules = set()
+        try:
+            file_names = os.listdir(directory)
+        except OSError:
+            return
+        for file_name in file_names:
+            path = os.path.join(directory, file_name)
+            try:
+                module_name = is_module_or_package(path)
+            except OSError:
+                continue
+            if module_name:
+                self.modules.add(module_name)
+
+    def is_outdated(self):
+        """True if the directory changed since it was listed.
+        """
+        return mtime(self.directory) != self.mtime
+
+
+class ModuleIndex(object):
+    """Knows the modules and packages of directories.
+
+    ``version`` changes whenever the index changes.
+    """
+    REFRESH_INTERVAL = 10
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = RLock()
+        self._thread = None
+        self.paths = []
+        self.version = 0
+
+    def modules(self, directory):
+        """Returns the set of module and package names in directory.
+
+        A directory unknown to the index is listed now.
+        """
+        directory = os.path.abspath(directory)
+        entry = self._entries.get(directory)
+        if entry is None:
+            entry = self.index(directory)
+        return entry.modules
+
+    def index(self, directory):
+        """Lists the modules of directory and stores them in the index.
+        """
+        entry = DirectoryEntry(directory)
+        self._lock.acquire()
+        try:
+            self._entries[directory] = entry
+            self.version += 1
+        finally:
+            self._lock.release()
+        return entry
+
+    def top_level_modules(self):
+        """Returns the names of all top level modules.
+
+        These are the modules in ``self.paths``, or in ``sys.path`` as long as
+        the index is not started.
+        """
+        result = set()
+        for path in self.paths or sys.path:
+            result.update(self.modules(path or os.curdir))
+        return result
+
+    def refresh(self):
+        """Lists every listed directory again that changed since then.
+        """
+        for directory, entry in self._entries.items():
+            if entry.is_outdated():
+                self.index(directory)
+
+    def start(self, paths):
+        """Indexes paths in a background thread and keeps the index fresh.
+        """
+        self.paths = list(paths)
+        if self._thread is None or not self._thread.isAlive():
+            self._thread = Thread(target=self._work)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _work(self):
+        """The loop of the background thread.
+        """
+        try:
+            self.top_level_modules()
+        except Exception, exc:
+            log("Module index failed: %r" % exc)
+        while True:
+            time.sleep(self.REFRESH_INTERVAL)
+            try:
+                self.refresh()
+            except Exception, exc:
+                log("Module index failed: %r" % exc)
+
+
+INDEX = ModuleIndex()
@@ -0,0 +1,60 @@
+"""An index of completionables for fast prefix searches.
+
+Big namespaces (like a module with a lot of names) are indexed once and then
+searched with bisect for every completion base.  Small namespaces are
+filtered linearly, which is cheaper than sorting them.
+"""
+from bisect import bisect_left
+
+
+# namespaces with fewer names are not indexed
+MIN_INDEXED = 64
+
+
+class PrefixIndex(object):
+    """Completionables sorted by name.
+
+    The index can be iterated like the list of completionables it is built
+    of.
+    """
+    def __init__(self, completionables):
+        self._completionables = sorted(completionables,
+                                       key=lambda element: element.name())
+        self._names = [element.name() for element in self._completionables]
+
+    def __iter__(self):
+        return iter(self._completionables)
+
+    def __len__(self):
+        return len(self._completionables)
+
+    def startswith(self, prefix):
+        """Returns the completionables whose names start with prefix.
+        """
+        start = bisect_left(self._names, prefix)
+        end = start
+        while end < len(self._names) and self._names[end].startswith(prefix):
+            end += 1
+        return self._completionables[start:end]
+
+
+def matches(completionables, prefix):
+    """Returns a list of the completionables whose names start with prefix.
+
+    Uses the index, if completionables is a ``PrefixIndex``.
+    """
+    if isinstance(completionables, PrefixIndex):
+        return completionables.startswith(prefix)
+    return [element for element in completionables
+            if element.name().startswith(prefix)]
+
+
+def index(completionables):
+    """Returns a ``PrefixIndex`` of completionables, or a tuple of them.
+
+    Namespaces smaller than ``MIN_INDEXED`` are kept as a tuple.
+    """
+    completionables = tuple(completionables)
+    if len(completionables) < MIN_INDEXED:
+        return completionables
+    return PrefixIndex(completionables)
@@ -0,0 +1,154 @@
+"""Loads the modules imported by a buffer before the first completion.
+
+Building the astng of the imported modules is the slow part of the first
+completion in a buffer.  The pre-warmer parses the buffer on a background
+thread and loads its imports, and the imports of these modules, into the
+astng manager.  The modules are loaded by their import depth, so the direct
+imports of the newest buffer come first.  Every buffer has a depth limit and
+a time budget.  The modules are loaded while holding the lock of the
+analysis state (see ``vim_monty.cache``).  See ``PREWARMER``.
+"""
+import heapq
+import itertools
+import time
+from threading import Condition, Thread
+
+from logilab.astng.builder import MANAGER
+
+from vim_monty import cache
+from vim_monty.dependencies import imported_names
+from vim_monty.incremental import UnregisteredBuilder
+from vim_monty.logger import log
+
+
+# PREWARMER and its thread survive reload_submodules
+KEEP_ON_RELOAD = True
+
+
+class Job(object):
+    """The pre-warming of the imports of one buffer.
+    """
+    def __init__(self, source, path=None, max_depth=2, budget=5.0):
+        self.source = source
+        self.path = path
+        self.max_depth = max_depth
+        self.deadline = time.time() + budget
+        self.seen = set()
+
+    def is_expired(self):
+        """True if the time budget of the job is used up.
+        """
+        return time.time() > self.deadline
+
+
+class Prewarmer(object):
+    """A thread loading the imports of the submitted buffers.
+
+    The queue holds tuples of (depth, sequence number, job, module name), the
+    buffer itself has depth 0.
+    """
+    def __init__(self, manager=MANAGER):
+        self.manager = manager
+        self._condition = Condition()
+        self._queue = []
+        self._counter = itertools.count()
+        self._not_modules = set()
+        self._thread = None
+
+    def submit(self, source, path=None, max_depth=2, budget=5.0):
+        """Queues the imports of source to be loaded.
+        """
+        job = Job(source, path, max_depth, budget)
+        self._push(0, job, None)
+        self._condition.acquire()
+        try:
+            if self._thread is None or not self._thread.isAlive():
+                self._thread = Thread(target=self._work)
+                self._thread.daemon = True
+                self._thread.start()
+        finally:
+            self._condition.release()
+        return job
+
+    def _push(self, depth, job, modname):
+        """Queues modname of job with the priority depth.
+        """
+        self._condition.acquire()
+        try:
+            heapq.heappush(self._queue,
+                           (depth, self._counter.next(), job, modname))
+            self._condition.notify()
+        finally:
+            self._condition.release()
+
+    def _next(self):
+        """Waits for the queued module with the lowest depth and returns it.
+        """
+        self._condition.acquire()
+        try:
+            while not self._queue:
+                self._condition.wait()
+            return heapq.heappop(self._queue)
+        finally:
+            self._condition.release()
+
+    def run_next(self):
+        """Loads the next queued module and queues its imports.
+        """
+        depth, _, job, modname = self._next()
+        if job.is_expired():
+            return
+        with cache.LOCK:
+            module = self._load(job, modname)
+        if module is not None and depth < job.max_depth:
+            for imported in sorted(imported_names(module)):
+                if imported not in job.seen:
+                    self._push(depth + 1, job, imported)
+
+    def _load(self, job, modname):
+        """Returns the module modname of job, or None if it is not loaded.
+
+        The buffer itself (modname None) is not stored in the manager.
+        """
+        if modname is None:
+            source = job.source
+            if not isinstance(source, basestring):
+                source = '\n'.join(source)
+            return UnregisteredBuilder(self.manager).string_build(
+                source, '', job.path)
+        if modname in job.seen or modname in self._not_modules:
+            return None
+        job.seen.add(modname)
+        try:
+            return self.manager.astng_from_module_name(modname)
+        except Exception:
+            # the name of a class or function imported from a module
+            self._not_modules.add(modname)
+            return None
+
+    def pending(self):
+        """Returns the number of queued modules.
+        """
+        return len(self._queue)
+
+    def _work(self):
+        """The loop of the background thread.
+        """
+        while True:
+            try:
+                self.run_next()
+            except Exception, exc:
+                log("Pre-warming failed: %r" % exc)
+
+
+PREWARMER = Prewarmer()
+
+
+def prewarm(src, path=None, max_depth=2, budget=5.0):
+    """Loads the imports of src up to max_depth in the background.
+
+    The source src is a string or a list of lines.  The loading stops after
+    budget seconds.
+    """
+    PREWARMER.submit(src, path, max_depth, budget)
+    return True
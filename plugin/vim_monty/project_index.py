@@ -0,0 +1,272 @@
+"""An index of the top level definitions of every module of a project.
+
+The index maps the path of every python file below the project root to the
+modification time and size of the file and to the ``(name, kind,
+linenumber)`` tuples of its top level classes, functions and variables.
+The files are analysed by a pool of processes, and only the files changed
+since the last run are analysed again.  The index is stored as compressed
+pickle.  Only ``vim_monty.definition`` looks names up in the index, the
+completion does not offer the names of modules which are not imported.
+
+The analysis of a big project takes a while, so the Vim plugin runs it in
+its own process::
+
+   python -m vim_monty.project_index [--processes N] ROOT INDEX_FILE
+"""
+import cPickle
+import hashlib
+import multiprocessing
+import os
+import subprocess
+import sys
+import zlib
+
+from logilab.astng.builder import MANAGER
+
+from vim_monty import language_elements
+from vim_monty import logger
+from vim_monty.logger import log
+from vim_monty.source import PyModule
+
+
+FORMAT_VERSION = 1
+
+SKIPPED_DIRECTORIES = ('.git', '.hg', '.svn', '.tox', 'build', 'dist')
+
+# fewer changed files are analysed without starting a process pool
+POOL_THRESHOLD = 50
+
+INDEXERS = {}
+
+
+def module_name(root, path):
+    """Returns the dotted module name of the file path below root.
+    """
+    relative_path = os.path.splitext(os.path.relpath(path, root))[0]
+    parts = relative_path.split(os.sep)
+    if parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
+
+
+def module_symbols(module):
+    """Returns the (name, kind, linenumber) of the definitions of module.
+
+    Imported names are not included.
+    """
+    symbols = []
+    for name, astng_element in module.items():
+        element = language_elements.LanguageElement.create(astng_element,
+                                                           name=name)
+        if isinstance(element, (language_elements.LeImport,
+                                language_elements.LeFrom)):
+            continue
+        symbols.append((name, element.kind(), element.linenumber()))
+    symbols.sort(key=lambda symbol: symbol[2])
+    return symbols
+
+
+def analyse_file(root, path):
+    """Returns the index entry (mtime, size, symbols) of the file path.
+
+    The module is dropped from the astng manager afterwards, the pool
+    processes analyse too many files to keep them all.
+    """
+    stat = os.stat(path)
+    modname = module_name(root, path)
+    symbols = []
+    try:
+        module = PyModule.BUILDER.file_build(path, modname)
+    except Exception, exc:
+        log("Could not index %s: %r" % (path, exc))
+    else:
+        try:
+            symbols = module_symbols(module)
+        finally:
+            if MANAGER.astng_cache.get(module.name) is module:
+                del MANAGER.astng_cache[module.name]
+    return stat.st_mtime, stat.st_size, symbols
+
+
+def _analyse(args):
+    """Pool version of analyse_file, returns the path with the entry.
+    """
+    root, path = args
+    try:
+        return path, analyse_file(root, path)
+    except OSError:
+        return path, None
+
+
+class ProjectIndex(object):
+    """The definitions of the python files below root.
+
+    *index_file* is the file the index is stored in, without it the index is
+    only kept in memory.
+    """
+    def __init__(self, root, index_file=None):
+        self.root = os.path.abspath(root)
+        self.index_file = index_file
+        self.entries = {}
+        self._definitions = None
+
+    def python_files(self):
+        """Returns the paths of every python file below the root.
+        """
+        paths = []
+        for directory, sub_directories, file_names in os.walk(self.root):
+            sub_directories[:] = [name for name in sub_directories
+                                  if not name.startswith('.') and
+                                  name not in SKIPPED_DIRECTORIES]
+            paths.extend(os.path.join(directory, name)
+                         for name in file_names if name.endswith('.py'))
+        return paths
+
+    def outdated(self, paths):
+        """Returns the paths whose entry is missing or outdated.
+        """
+        result = []
+        for path in paths:
+            entry = self.entries.get(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if entry is None or entry[:2] != (stat.st_mtime, stat.st_size):
+                result.append(path)
+        return result
+
+    def update(self, processes=None):
+        """Analyses the new and changed files and drops the removed ones.
+
+        Returns the number of analysed files.
+        """
+        paths = self.python_files()
+        for removed in set(self.entries) - set(paths):
+            del self.entries[removed]
+        outdated = self.outdated(paths)
+        if processes == 1 or len(outdated) < POOL_THRESHOLD:
+            results = (_analyse((self.root, path)) for path in outdated)
+            self._store_results(results)
+        else:
+            pool = multiprocessing.Pool(processes)
+            try:
+                self._store_results(pool.imap_unordered(
+                    _analyse, [(self.root, path) for path in outdated],
+                    chunksize=16))
+            finally:
+                pool.close()
+                pool.join()
+        self._definitions = None
+        return len(outdated)
+
+    def _store_results(self, results):
+        """Stores the (path, entry) results of the analysis.
+        """
+        for path, entry in results:
+            if entry is None:
+                self.entries.pop(path, None)
+            else:
+                self.entries[path] = entry
+
+    def load(self):
+        """Loads the stored index, returns false if there is none.
+        """
+        if not self.index_file:
+            return False
+        try:
+            index_file = open(self.index_file, 'rb')
+        except IOError:
+            return False
+        try:
+            try:
+                if cPickle.load(index_file) != (FORMAT_VERSION, self.root):
+                    return False
+                self.entries = cPickle.loads(
+                    zlib.decompress(index_file.read()))
+            finally:
+                index_file.close()
+        except Exception, exc:
+            log("Could not load the project index: %r" % exc)
+            return False
+        self._definitions = None
+        return True
+
+    def save(self):
+        """Stores the index in the index file.
+        """
+        if not self.index_file:
+            return
+        directory = os.path.dirname(self.index_file)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp_file_path = '%s.%d.tmp' % (self.index_file, os.getpid())
+        index_file = open(tmp_file_path, 'wb')
+        try:
+            cPickle.dump((FORMAT_VERSION, self.root), index_file,
+                         cPickle.HIGHEST_PROTOCOL)
+            index_file.write(zlib.compress(
+                cPickle.dumps(self.entries, cPickle.HIGHEST_PROTOCOL)))
+        finally:
+            index_file.close()
+        os.rename(tmp_file_path, self.index_file)
+
+    def find(self, name):
+        """Returns the (path, kind, linenumber) of the definitions of name.
+        """
+        if self._definitions is None:
+            definitions = {}
+            for path, (_, _, symbols) in self.entries.iteritems():
+                for symbol_name, kind, linenumber in symbols:
+                    definitions.setdefault(symbol_name, []).append(
+                        (path, kind, linenumber))
+            self._definitions = definitions
+        return sorted(self._definitions.get(name, ()))
+
+
+def index_file_path(directory, root):
+    """Returns the path of the index file of root in the cache directory.
+    """
+    digest = hashlib.sha1(os.path.abspath(root)).hexdigest()
+    return os.path.join(directory, 'project-%s.index' % digest)
+
+
+def start_indexer(root, index_file, python='python', path=()):
+    """Updates the stored index of root in a new process.
+
+    Does nothing while the last process started for root is running.  The
+    directories in path are added to the PYTHONPATH of the process.
+    """
+    process = INDEXERS.get(root)
+    if process is not None and process.poll() is None:
+        return process
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        list(path) + [env.get('PYTHONPATH', '')]).rstrip(os.pathsep)
+    output = logger.output_file()
+    try:
+        INDEXERS[root] = subprocess.Popen(
+            [python, '-m', 'vim_monty.project_index', root, index_file],
+            env=env, stdout=output, stderr=output)
+    finally:
+        output.close()
+    return INDEXERS[root]
+
+
+def main(argv=None):
+    """Updates the stored index of a project, see the module documentation.
+    """
+    args = list(sys.argv[1:] if argv is None else argv)
+    processes = None
+    if args[:1] == ['--processes']:
+        processes = int(args[1])
+        del args[:2]
+    root, index_file = args
+    index = ProjectIndex(root, index_file)
+    index.load()
+    index.update(processes)
+    index.save()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Repair of the line under the cursor before the source is built.
+
+The line under the cursor is usually incomplete, so it is replaced by a fill
+like ``pass``.  Instead of building the whole source with every possible fill,
+the ``Repairer`` checks the fills on the top level block around the cursor
+with the python compiler and remembers the fill that worked.
+"""
+from ast import PyCF_ONLY_AST
+
+
+FILLS = ('pass', 'except: pass', 'except:', '')
+
+CONTINUATION_KEYWORDS = ('else', 'elif', 'except', 'finally')
+
+
+def indention_by_line(line):
+    """Returns the indention of the given line.
+    """
+    indention = ''
+    for char in line:
+        if char == ' ' or char == '\n':
+            indention += char
+        else:
+            break
+    return indention
+
+
+def is_block_start(line):
+    """True if the line looks like the start of a top level statement.
+    """
+    if not line or line[0] in ' \t#)]}\'"':
+        return False
+    first_word = line.split(None, 1)[0].rstrip(':')
+    return first_word not in CONTINUATION_KEYWORDS
+
+
+def enclosing_block(source_lines, linenumber):
+    """Returns the (zero based) line range of the top level block at linenumber.
+
+    The range is the half-open interval from the start of the block to the
+    start of the next top level statement.
+    """
+    start = 0
+    for index in xrange(linenumber - 1, -1, -1):
+        if is_block_start(source_lines[index]):
+            start = index
+            break
+    while start > 0 and source_lines[start - 1].startswith('@'):
+        start -= 1
+    end = len(source_lines)
+    for index in xrange(linenumber + 1, len(source_lines)):
+        if is_block_start(source_lines[index]):
+            end = index
+            break
+    return start, end
+
+
+def compiles(lines):
+    """True if the given lines are valid python syntax.
+    """
+    try:
+        compile('\n'.join(lines) + '\n', '<block>', 'exec', PyCF_ONLY_AST)
+        return True
+    except (SyntaxError, TypeError, ValueError):
+        return False
+
+
+class Repairer(object):
+    """Decides which fill replaces the line under the cursor.
+
+    The fill that worked is remembered per (key, linenumber, indention), so
+    the next request on the same line tries it first.
+    """
+    MAX_REMEMBERED = 1000
+
+    def __init__(self):
+        self._remembered = {}
+
+    def candidates(self, source_lines, linenumber, key=None):
+        """Returns the lines to try instead of the line at linenumber.
+
+        The first candidate is the one that makes the enclosing block valid,
+        the others follow as fallback in the usual order.
+        """
+        original_line = source_lines[linenumber]
+        indention = indention_by_line(original_line)
+        fills = [indention + fill for fill in FILLS] + [original_line]
+        remembered = self._remembered.get((key, linenumber, indention))
+        if remembered in fills:
+            fills.remove(remembered)
+            fills.insert(0, remembered)
+        start, end = enclosing_block(source_lines, linenumber)
+        block = source_lines[start:end]
+        for fill in fills:
+            block[linenumber - start] = fill
+            if compiles(block):
+                fills.remove(fill)
+                fills.insert(0, fill)
+                break
+        return fills
+
+    def remember(self, original_line, linenumber, fill, key=None):
+        """Remembers that fill worked instead of original_line at linenumber.
+        """
+        if len(self._remembered) >= self.MAX_REMEMBERED:
+            self._remembered.clear()
+        indention = indention_by_line(original_line)
+        self._remembered[(key, linenumber, indention)] = fill
@@ -0,0 +1,149 @@
+"""A completion server, which keeps the analysis state warm between requests.
+
+Start it with ``python -m vim_monty.server``.  It reads one JSON request per
+line from stdin and writes one JSON response per line to stdout::
+
+   {"id": 1, "method": "completion", "params": {"src": "...", ...}}
+   {"id": 1, "result": [...]}
+
+Errors are returned as ``{"id": 1, "error": {"message": "..."}}``.  The
+astng manager, the module caches and the builtins stay loaded as long as the
+server runs, see ``vim_monty.client`` for the other side.
+"""
+import json
+import sys
+
+import vim_monty
+import vim_monty.definition
+from vim_monty import completion_builders
+from vim_monty import dependencies
+from vim_monty import disk_cache
+from vim_monty import logger
+from vim_monty import module_index
+from vim_monty import prewarm
+from vim_monty import project_index
+from vim_monty import snapshot
+from vim_monty import stats
+from vim_monty.logger import log
+
+
+def buffer_source(src, buffer_id):
+    """Returns src, or the lines of the buffer if src is None.
+
+    The lines of a buffer are sent with ``update_buffer``.
+    """
+    if src is not None:
+        return src
+    buffer_snapshot = snapshot.SNAPSHOTS.get(buffer_id)
+    if buffer_snapshot is None:
+        raise snapshot.OutOfSync('Buffer %s is unknown.' % buffer_id)
+    return buffer_snapshot.lines
+
+
+def completion(src, line, lineno, column, base, builder=None,
+               buffer_id=None, limit=None, start=0):
+    """Remote version of vim_monty.completion.
+
+    The completion builder is given by its name in
+    ``vim_monty.completion_builders``.  Without src the lines of the buffer
+    buffer_id are completed.
+    """
+    completion_builder = None
+    if builder:
+        completion_builder = getattr(completion_builders, builder)
+    return vim_monty.completion(buffer_source(src, buffer_id), line, lineno,
+                                column, base, completion_builder, buffer_id,
+                                limit, start)
+
+
+def definition(src, line, lineno, column, buffer_id=None):
+    """Remote version of vim_monty.definition.definition.
+    """
+    return vim_monty.definition.definition(buffer_source(src, buffer_id),
+                                           line, lineno, column, buffer_id)
+
+
+def update_buffer(buffer_id, base_changedtick, changedtick, start, end,
+                  replacement):
+    """Applies a change to the lines of a buffer, see SnapshotStore.apply.
+    """
+    snapshot.SNAPSHOTS.apply(buffer_id, base_changedtick, changedtick, start,
+                             end, replacement)
+    return True
+
+
+def configure(debug=False, cache_dir=None, project_root=None,
+              profile_threshold=None):
+    """Sets the options of the server, like the Vim plugin does for itself.
+
+    With a *project_root* and a *cache_dir* go-to-definition uses the stored
+    project index of the root.
+    """
+    logger.ENABLED = debug
+    disk_cache.configure(cache_dir)
+    stats.PROFILE_THRESHOLD = profile_threshold
+    if project_root and cache_dir:
+        vim_monty.definition.load_project_index(
+            project_root, project_index.index_file_path(cache_dir,
+                                                        project_root))
+    return True
+
+
+def ping():
+    """Returns true to show that the server is alive.
+    """
+    return True
+
+
+METHODS = {
+    'completion': completion,
+    'configure': configure,
+    'definition': definition,
+    'find_base_column': vim_monty.find_base_column,
+    'ping': ping,
+    'prewarm': prewarm.prewarm,
+    'stats': stats.STATS.as_dict,
+    'update_buffer': update_buffer,
+}
+
+
+def handle(request):
+    """Returns the response of a decoded request.
+    """
+    response = {'id': request.get('id')}
+    try:
+        method = METHODS[request['method']]
+        params = dict((str(name), value) for name, value
+                      in request.get('params', {}).iteritems())
+        response['result'] = method(**params)
+    except Exception, exc:
+        log(exc)
+        response['error'] = {'message': '%s: %s' % (exc.__class__.__name__,
+                                                     exc)}
+    return response
+
+
+def serve(instream=sys.stdin, outstream=sys.stdout):
+    """Answers the requests of instream until it is closed.
+    """
+    while True:
+        line = instream.readline()
+        if not line:
+            break
+        try:
+            request = json.loads(line)
+        except ValueError, exc:
+            response = {'id': None, 'error': {'message': str(exc)}}
+        else:
+            response = handle(request)
+        outstream.write(json.dumps(response) + '\n')
+        outstream.flush()
+
+
+if __name__ == '__main__':
+    RESPONSES = sys.stdout
+    # keep the output of libraries out of the responses
+    sys.stdout = sys.stderr
+    module_index.INDEX.start(sys.path)
+    dependencies.GRAPH.start()
+    serve(sys.stdin, RESPONSES)
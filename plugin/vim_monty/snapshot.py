@@ -0,0 +1,146 @@
+"""Snapshots of the lines of the edited buffers.
+
+Joining the lines of a big buffer to a string on every key press, only to
+split it again for the analysis, copies the whole buffer many times.  The
+analysis accepts the list of lines instead, and a snapshot keeps this list
+as long as the ``b:changedtick`` of the buffer does not change.  The
+completion server gets only the changed range of lines, see
+``changed_range`` and ``SnapshotStore.apply``.
+"""
+from collections import OrderedDict
+from threading import Lock
+
+
+def lines_of(source):
+    """Returns the list of lines of source, a string or a list of lines.
+
+    A list is returned as it is, not copied.
+    """
+    if isinstance(source, basestring):
+        return source.split('\n')
+    return source
+
+
+def changed_range(old_lines, new_lines):
+    """Returns (start, end, replacement) to turn old_lines into new_lines.
+
+    The old lines start to end (zero based, end excluded) are replaced by
+    the replacement lines.  Returns None if the lines are equal.
+    """
+    limit = min(len(old_lines), len(new_lines))
+    start = 0
+    while start < limit and old_lines[start] == new_lines[start]:
+        start += 1
+    if start == len(old_lines) == len(new_lines):
+        return None
+    suffix = 0
+    while (suffix < limit - start and
+           old_lines[-1 - suffix] == new_lines[-1 - suffix]):
+        suffix += 1
+    return (start, len(old_lines) - suffix,
+            new_lines[start:len(new_lines) - suffix])
+
+
+class ReplacedLine(object):
+    """A read only view of lines with the line at index replaced by line.
+
+    The repairs of the cursor line use it, the shared lines of a snapshot
+    are neither copied nor changed.
+    """
+    def __init__(self, lines, index, line):
+        self.lines = lines
+        self.index = index
+        self.line = line
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self.lines))
+            if step == 1 and not start <= self.index < stop:
+                return self.lines[start:stop]
+            return [self[index] for index in xrange(start, stop, step)]
+        if key < 0:
+            key += len(self.lines)
+        if key == self.index:
+            return self.line
+        return self.lines[key]
+
+    def __iter__(self):
+        for index, line in enumerate(self.lines):
+            yield self.line if index == self.index else line
+
+
+class OutOfSync(Exception):
+    """A change was based on another state of the buffer than the stored.
+    """
+
+
+class Snapshot(object):
+    """The lines of a buffer at the given changedtick.
+    """
+    def __init__(self, changedtick, lines):
+        self.changedtick = changedtick
+        self.lines = lines
+
+
+class SnapshotStore(object):
+    """The snapshots of the last ``MAX_BUFFERS`` buffers by buffer id.
+
+    The store may be used by several threads.  The stored lists of lines are
+    never changed, a change stores a new list.
+    """
+    MAX_BUFFERS = 16
+
+    def __init__(self):
+        self._snapshots = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, buffer_id):
+        """Returns the snapshot of the buffer or None.
+        """
+        with self._lock:
+            return self._snapshots.get(buffer_id)
+
+    def store(self, buffer_id, changedtick, lines):
+        """Stores lines as the snapshot of the buffer at changedtick.
+        """
+        with self._lock:
+            self._snapshots.pop(buffer_id, None)
+            if len(self._snapshots) >= self.MAX_BUFFERS:
+                self._snapshots.popitem(last=False)
+            snapshot = Snapshot(changedtick, lines)
+            self._snapshots[buffer_id] = snapshot
+            return snapshot
+
+    def update(self, buffer_id, changedtick, read_lines):
+        """Returns the snapshot of the buffer at changedtick.
+
+        The lines are read with read_lines only if the buffer changed since
+        the last snapshot.
+        """
+        snapshot = self.get(buffer_id)
+        if snapshot is not None and snapshot.changedtick == changedtick:
+            return snapshot
+        return self.store(buffer_id, changedtick, read_lines())
+
+    def apply(self, buffer_id, base_changedtick, changedtick, start, end,
+              replacement):
+        """Applies a change to the snapshot of the buffer at base_changedtick.
+
+        Raises OutOfSync if the stored snapshot has another changedtick.
+        """
+        snapshot = self.get(buffer_id)
+        if base_changedtick is not None:
+            if snapshot is None or snapshot.changedtick != base_changedtick:
+                raise OutOfSync('Buffer %s is not at %s.' % (
+                    buffer_id, base_changedtick))
+            lines = snapshot.lines[:start] + list(replacement) + \
+                snapshot.lines[end:]
+        else:
+            lines = list(replacement)
+        return self.store(buffer_id, changedtick, lines)
+
+
+SNAPSHOTS = SnapshotStore()
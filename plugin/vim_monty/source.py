@@ -1,12 +1,24 @@
 """Interface to simplify source code analysis with logilab astng.
 """
+from bisect import bisect_right
+import heapq
 import os
+import traceback
 
 from logilab.astng.builder import ASTNGBuilder
+from logilab.astng.scoped_nodes import LocalsDictNodeNG
 
 from vim_monty import language_elements
 from vim_monty import completionable
+from vim_monty import cache
+from vim_monty import cursor_context
+from vim_monty import prefix_index
+from vim_monty import module_index
+from vim_monty import incremental
+from vim_monty import repair
+from vim_monty.snapshot import lines_of, ReplacedLine
 from vim_monty.logger import log
+from vim_monty.stats import STATS
 
 
 
@@ -15,43 +27,185 @@ def reload_submodules():
     """
     for name, value in globals().iteritems():
         if(not name.startswith('__') and not name.endswith('__') and
-           value.__class__.__name__ == 'module'):
+           value.__class__.__name__ == 'module' and
+           not getattr(value, 'KEEP_ON_RELOAD', False)):
             if hasattr(value, 'reload_submodules'):
                 value.reload_submodules()
             reload(value)
 
 
-def completion(file_state, base='', completion_builder=None):
-    """Returns the completion.
+RESOLVE_LIMIT = 30
+
+PAGE_SIZE = 50
+
+
+def completion(file_state, base='', completion_builder=None, limit=None,
+               start=0):
+    """Returns the completion, at most limit entries from the entry start.
 
     Use this function as entry point to this module.  See __init__.completion.
+    The statistics of the request are recorded in ``vim_monty.stats``.
+    """
+    with cache.LOCK, STATS.request('completion'):
+        try:
+            accessibles = request_accessibles(file_state)
+            return completion_entries(accessibles, file_state, base,
+                                      completion_builder, limit=limit,
+                                      start=start)
+        except Exception, exc:
+            request_failed(exc)
+            return []
+
+
+def completion_pages(file_state, base='', completion_builder=None,
+                     page_size=PAGE_SIZE):
+    """Yields the completion in pages of page_size entries.
+
+    Only the entries of the requested pages are sorted and built, so the
+    first page of a huge namespace is returned early.  The request lasts
+    until the last page is taken, the lock is only held for every page.
+    """
+    with STATS.request('completion'):
+        try:
+            with cache.LOCK:
+                accessibles = request_accessibles(file_state)
+            pages = entry_pages(accessibles, file_state, base,
+                                completion_builder, page_size)
+            while True:
+                with cache.LOCK:
+                    page = next(pages, None)
+                if page is None:
+                    return
+                yield page
+        except Exception, exc:
+            request_failed(exc)
+
+
+def request_failed(exc):
+    """Logs the exception of a failed request and records it as error.
     """
-    try:
-        accessibles = file_state.accessibles()
-        accessibles.sort()
-        return [accessible.completion_entry(completion_builder, file_state)
-                for accessible in accessibles if accessible.startswith(base)]
-    except Exception, exc:
-        log(exc)
-        import traceback
-        log(traceback.format_exc())
+    log(exc)
+    log(traceback.format_exc())
+    STATS.error()
+
+
+def request_accessibles(file_state):
+    """Returns the accessibles of file_state, for the completion entry points.
+    """
+    with STATS.span('accessibles'):
+        return file_state.accessibles()
+
+
+def completion_entries(accessibles, file_state, base='',
+                       completion_builder=None, resolve_limit=RESOLVE_LIMIT,
+                       limit=None, start=0):
+    """Returns the sorted completion entries of accessibles matching base.
+
+    The accessibles are filtered first, so only the matches are sorted and
+    built to entries.  At most resolve_limit deferred accessibles (see
+    ``Completionable.is_deferred``) are resolved, the others are built with
+    the ``deferred`` builder of completion_builder.  They are resolved once
+    their imports are cached by other requests.  A resolve_limit of None
+    resolves all of them.  With a limit only limit entries from the entry
+    start on are built, see ``entry_pages``.
+    """
+    if limit is not None or start:
+        for page in entry_pages(accessibles, file_state, base,
+                                completion_builder, limit, resolve_limit,
+                                start):
+            return page
         return []
+    with STATS.span('sort'):
+        matches = prefix_index.matches(accessibles, base)
+        matches.sort(key=lambda accessible: accessible.sort_key())
+    return build_entries(matches, file_state, completion_builder,
+                         resolve_limit)[0]
+
+
+def entry_pages(accessibles, file_state, base='', completion_builder=None,
+                page_size=PAGE_SIZE, resolve_limit=RESOLVE_LIMIT, start=0):
+    """Yields the completion entries of accessibles in pages of page_size.
+
+    The matches are kept in a heap by their sort key, every page pops its
+    entries off the heap.  The order is the one of ``completion_entries``.
+    The first start entries are skipped without building them, a page_size
+    of None yields the rest in one page.
+    """
+    with STATS.span('sort'):
+        heap = [(accessible.sort_key(), index, accessible)
+                for index, accessible
+                in enumerate(prefix_index.matches(accessibles, base))]
+        heapq.heapify(heap)
+        for _ in range(min(start, len(heap))):
+            heapq.heappop(heap)
+    page_size = max(page_size or len(heap), 1)
+    while heap:
+        page = [heapq.heappop(heap)[2]
+                for _ in range(min(page_size, len(heap)))]
+        entries, resolve_limit = build_entries(page, file_state,
+                                               completion_builder,
+                                               resolve_limit)
+        yield entries
+
+
+def build_entries(matches, file_state, completion_builder=None,
+                  resolve_limit=RESOLVE_LIMIT):
+    """Returns the entries of matches and the remaining resolve_limit.
+
+    See ``completion_entries``.
+    """
+    deferred_builder = getattr(completion_builder, 'deferred',
+                               completion_builder)
+    entries = []
+    with STATS.span('build'):
+        for accessible in matches:
+            builder = completion_builder
+            if resolve_limit is not None and accessible.is_deferred():
+                if resolve_limit > 0:
+                    resolve_limit -= 1
+                else:
+                    builder = deferred_builder
+            entries.append(accessible.completion_entry(builder, file_state))
+    return entries, resolve_limit
 
 
 class FileState(object):
     """Represents the current state in the python file.
 
     The context is given by *line*, *source*, *linenumber* and *column*.
+    The optional *buffer_id* identifies the edited buffer, parse results of
+    the same buffer are reused by the next request.  A PyModule of the
+    source given as *module* is used instead of building one.
     """
-    def __init__(self, line, source, linenumber, column):
+    def __init__(self, line, source, linenumber, column, buffer_id=None,
+                 module=None):
         self.line = line
         self.source = source
         self.linenumber = linenumber
         self.column = column
+        self.buffer_id = buffer_id
+        self._module = module
+        self._cursor_context = None
+
+    def cursor_context(self):
+        """Returns the CursorContext of the cursor, it is analyzed only once.
+
+        See ``vim_monty.cursor_context``.
+        """
+        if self._cursor_context is None:
+            self._cursor_context = cursor_context.analyze(
+                lines_of(self.source), self.linenumber, self.line, self.column)
+        return self._cursor_context
 
     def accessibles(self):
         """Returns all accessibles of this file state.
+
+        The result is a list or tuple, or a ``PrefixIndex`` for big
+        namespaces.
+        Nothing is completed in strings and comments.
         """
+        if not self.cursor_context().is_code():
+            return []
         if self.need_import_statement():
             return [completionable.Completionable('import ')]
         elif self.is_import_path():
@@ -65,25 +219,31 @@ class FileState(object):
 
         A context string is a path like 'os.path.dirname'.
         """
-        column = min(self.column, len(self.line))
-        start_index = column
-        while start_index > 0:
-            start_index -= 1
-            if self.line[start_index] in ' \t;([{:,=<>':
-                start_index += 1
-                break
-        string_of_interest = self.line[start_index:self.column]
-        if string_of_interest and string_of_interest[-1] == '.':
-            return string_of_interest[:-1]
-        return string_of_interest
+        return self.cursor_context().context_string
+
+    def module(self):
+        """Returns the PyModule of the source, it is built only once.
+        """
+        if self._module is None:
+            with STATS.span('parse'):
+                self._module = PyModule.by_source(
+                    self.source, self.linenumber - 1, cache_key=self.buffer_id)
+        return self._module
 
     def context(self):
         """Calc the context element marked by the given line and column number.
         """
         context_string = self.context_string()
-        module = PyModule.by_source(self.source, self.linenumber - 1)
-        scope = module.scope(self.linenumber)
-        return scope.lookup(context_string)
+        scope = self.module().scope(self.linenumber)
+        with STATS.span('lookup'):
+            return scope.lookup(context_string)
+
+    def scope_accessibles(self):
+        """Returns the names of the scope at the cursor.
+
+        This is cheap compared to ``accessibles``, nothing is inferred.
+        """
+        return self.module().scope(self.linenumber).free_accessibles()
 
     def import_path_completion(self):
         """Get completion of import paths.
@@ -92,6 +252,8 @@ class FileState(object):
         ``import os.`` or ``from os.``.
         """
         import_path = self.context_string()
+        if not import_path:
+            return top_level_modules()
         module = PyModule.by_module_path(import_path)
         accessibles = module.package_modules()
         accessibles.update(module.accessible_modules())
@@ -101,106 +263,147 @@ class FileState(object):
         """Returns completion of from import lines.
 
         Complete the part after ``import`` in lines like ``from os import``.
+        The names are cached per module and version of the module index,
+        which lists the submodules of packages.
         """
-        import_path = import_path or self.tokens()[1]
+        import_path = import_path or self.cursor_context().import_path
         module = PyModule.by_module_path(import_path)
-        accessibles = module.package_modules()
-        accessibles.update(module.accessibles())
-        return list(accessibles)
-
-    def tokens(self, complete=False):
-        """Returns a list of tokens (strings) of the current line.
-
-        If ``complete`` ist true, use only the line before the current column.
-        """
-        if complete:
-            return self.line.strip().split()
-        return self.line[:self.column].strip().split()
+        version = module_index.INDEX.version
+        index = PyModule.IMPORT_INDEXES.get(module.astng_module, extra=version)
+        if index is None:
+            accessibles = module.package_modules()
+            accessibles.update(module.accessibles())
+            index = PyModule.IMPORT_INDEXES.set(
+                module.astng_module, prefix_index.index(accessibles),
+                extra=version)
+        return index
 
     def is_import_path(self):
         """Returns true, if the current context is a import path.
 
         A import path ist the part after import or between from and import.
         """
-        tokens = self.tokens()
-        return (tokens and
-                (tokens[0] == 'import' or
-                 (tokens[0] == 'from' and len(tokens) < 3)))
+        return self.cursor_context().kind == cursor_context.IMPORT_PATH
 
     def is_from_import(self):
         """True, if the context is the part after import of a from line.
         """
-        tokens = self.tokens()
-        return tokens and tokens[0] == 'from' and tokens[2] == 'import'
+        return self.cursor_context().kind == cursor_context.FROM_IMPORT
 
     def need_import_statement(self):
         """True, if we are in a from line and now we need the import keyword.
         """
-        tokens = self.tokens()
-        return (len(tokens) == 2 and
-                tokens[0] == 'from' and
-                self.line.endswith(' '))
+        return self.cursor_context().kind == cursor_context.NEED_IMPORT
 
 
-def indention_by_line(line):
-    """Returns the indention of the given line.
+def top_level_modules():
+    """Returns a prefix index of the top level modules.
+
+    The index is rebuilt only if the module index changed.
     """
-    indention = ''
-    for char in line:
-        if char == ' ' or char == '\n':
-            indention += char
-        else:
-            break
-    return indention
+    version = module_index.INDEX.version
+    if TOP_LEVEL_MODULES[0] != version:
+        TOP_LEVEL_MODULES[:] = [version, prefix_index.PrefixIndex(
+            completionable.Completionable(name)
+            for name in module_index.INDEX.top_level_modules())]
+    return TOP_LEVEL_MODULES[1]
+
+TOP_LEVEL_MODULES = [None, None]
 
 
-def is_module_or_package(module_path):
-    """Is the given path a python module or package.
+class ScopeIndex(object):
+    """Finds the innermost scope of a module containing a line.
 
-    Returns the module name if it is a module or a package, else None.
+    The scopes of every level are sorted by their first line once, so a
+    scope is found with a binary search on every level.
     """
-    module_extensions = ('.py', '.pyc', '.pyo', '.pyw')
-    module_file = os.path.basename(module_path)
-    module_name, extension = os.path.splitext(module_file)
-    if os.path.isdir(module_path):
-        for module_extension in module_extensions:
-            if '__init__' + module_extension in os.listdir(module_path):
-                return module_name
-    else:
-        if module_name != '__init__' and extension in module_extensions:
-            return module_name
-    return None
+    def __init__(self, astng_module):
+        self.astng_module = astng_module
+        self._levels = {}
+
+    def level(self, scope):
+        """Returns the first lines and the sub scopes of scope, sorted.
+        """
+        try:
+            return self._levels[id(scope)]
+        except KeyError:
+            sub_scopes = sorted((sub_scope for sub_scope in scope.values()
+                                 if isinstance(sub_scope, LocalsDictNodeNG)),
+                                key=lambda sub_scope: sub_scope.fromlineno)
+            level = ([sub_scope.fromlineno for sub_scope in sub_scopes],
+                     sub_scopes)
+            self._levels[id(scope)] = level
+            return level
+
+    def scope(self, linenumber):
+        """Returns the innermost astng scope containing linenumber.
+        """
+        scope = self.astng_module
+        while True:
+            starts, sub_scopes = self.level(scope)
+            index = bisect_right(starts, linenumber) - 1
+            if index < 0 or sub_scopes[index].tolineno < linenumber:
+                return scope
+            scope = sub_scopes[index]
 
 
 class PyModule(object):
     BUILDER = ASTNGBuilder()
+    INCREMENTAL_BUILDER = incremental.IncrementalBuilder(BUILDER)
+    REPAIRER = repair.Repairer()
+    SCOPE_INDEXES = cache.NodeCache(max_entries=16, name='scope_indexes')
+    IMPORT_INDEXES = cache.NodeCache(max_entries=100, name='import_indexes')
 
     def __init__(self, module):
         self.astng_module = module
 
-    def scope(self, linenumber, scope=None):
-        scope = scope or self.astng_module
-        for a_scope in scope.values():
-            if a_scope.fromlineno <= linenumber <= a_scope.tolineno:
-                scope = self.scope(linenumber, a_scope)
-                break
-        if isinstance(scope, language_elements.LanguageElement):
-            return scope
+    def scope_index(self):
+        """Returns the scope index of this module, built once per parse.
+        """
+        index = self.SCOPE_INDEXES.get(self.astng_module)
+        if index is None:
+            index = self.SCOPE_INDEXES.set(self.astng_module,
+                                           ScopeIndex(self.astng_module))
+        return index
+
+    def scope(self, linenumber):
+        """Returns the language element of the scope containing linenumber.
+        """
+        with STATS.span('scope'):
+            scope = self.scope_index().scope(linenumber)
         return language_elements.LanguageElement.create(scope)
 
     @classmethod
-    def by_source(cls, source, linenumber=None):
+    def by_source(cls, source, linenumber=None, cache_key=None,
+                  keep_line=False):
+        """Builds the module of source, repairing the line linenumber.
+
+        With a cache_key the module is built incrementally on the module of
+        the previous call with the same key.  The source is a string or a
+        list of lines, the list is not changed by the repairs.  With
+        keep_line the unchanged line is tried first, for requests on
+        complete lines like go-to-definition.
+        """
         if linenumber is not None:
-            source_lines = source.split('\n')
+            source_lines = lines_of(source)
             original_line = source_lines[linenumber]
-            indention = indention_by_line(original_line)
-            for fill in ('pass', 'except: pass', 'except:', '', original_line):
+            fills = cls.REPAIRER.candidates(source_lines, linenumber,
+                                            cache_key)
+            if keep_line:
+                fills.insert(0, original_line)
+            for fill in fills:
+                STATS.count('repair_attempts')
                 try:
-                    source_lines[linenumber] = indention + fill
-                    module = cls.BUILDER.string_build('\n'.join(source_lines))
+                    module = cls.INCREMENTAL_BUILDER.build(
+                        ReplacedLine(source_lines, linenumber, fill),
+                        cache_key)
+                    if fill is not original_line:
+                        cls.REPAIRER.remember(original_line, linenumber,
+                                              fill, cache_key)
                     return cls(module)
                 except:
                     pass
+            cls.INCREMENTAL_BUILDER.forget(cache_key)
             raise NotImplementedError("TODO: Can't parse file")
         else:
             raise RuntimeError("No line number given.")
@@ -216,11 +419,8 @@ class PyModule(object):
         result = set()
         if self.astng_module.package:
             package_dir = os.path.dirname(self.astng_module.file)
-            for module_file in os.listdir(package_dir):
-                module_path = os.path.join(package_dir, module_file)
-                module_name = is_module_or_package(module_path)
-                if module_name:
-                    result.add(completionable.Completionable(module_name))
+            for module_name in module_index.INDEX.modules(package_dir):
+                result.add(completionable.Completionable(module_name))
         return result
 
     def accessible_modules(self):
@@ -0,0 +1,207 @@
+"""Timing and cache statistics of the completion requests.
+
+Every request records the time spent in its stages (spans) like ``parse``,
+``lookup`` or ``inference``, the number of repair attempts and the errors.
+The caches count their hits and misses (see ``vim_monty.cache``).  With a
+``PROFILE_THRESHOLD`` the requests are profiled, and the profile of a
+request slower than the threshold is kept.  See ``STATS``.
+"""
+from collections import deque
+from contextlib import contextmanager
+import cProfile
+import json
+import pstats
+from cStringIO import StringIO
+import time
+import traceback
+from threading import local
+
+from vim_monty import cache
+
+
+# seconds, profile the requests and keep the profiles of slower ones
+PROFILE_THRESHOLD = None
+
+
+class RequestStats(object):
+    """The statistics of one request.
+
+    ``spans`` maps every stage name to the number of times it ran and the
+    total seconds spent in it.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.start = time.time()
+        self.duration = None
+        self.spans = {}
+        self.counters = {}
+        self.error = None
+        self.profile = None
+
+    def add_span(self, name, seconds):
+        """Adds seconds spent in the stage name.
+        """
+        count, total = self.spans.get(name, (0, 0.0))
+        self.spans[name] = (count + 1, total + seconds)
+
+    def as_dict(self):
+        """Returns the statistics as JSON serializable dictionary.
+        """
+        return {
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round((self.duration or 0) * 1000, 3),
+            'spans': dict((name, {'count': count,
+                                  'total_ms': round(total * 1000, 3)})
+                          for name, (count, total) in self.spans.iteritems()),
+            'counters': dict(self.counters),
+            'error': self.error,
+            'profile': self.profile,
+        }
+
+
+class Stats(object):
+    """Keeps the statistics of the last ``MAX_REQUESTS`` requests.
+    """
+    MAX_REQUESTS = 50
+
+    def __init__(self):
+        self.requests = deque(maxlen=self.MAX_REQUESTS)
+        self.errors = 0
+        self._local = local()
+
+    def current(self):
+        """Returns the statistics of the running request of this thread.
+        """
+        return getattr(self._local, 'request', None)
+
+    @contextmanager
+    def request(self, name):
+        """Records the statistics of the request run in this block.
+
+        Nested requests are recorded as span of the outer request.
+        """
+        if self.current() is not None:
+            with self.span(name):
+                yield self.current()
+            return
+        request = RequestStats(name)
+        self._local.request = request
+        profile = None
+        if PROFILE_THRESHOLD is not None:
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            yield request
+        finally:
+            if profile is not None:
+                profile.disable()
+            request.duration = time.time() - request.start
+            if profile is not None and request.duration > PROFILE_THRESHOLD:
+                output = StringIO()
+                profile_stats = pstats.Stats(profile, stream=output)
+                profile_stats.sort_stats('cumulative').print_stats(30)
+                request.profile = output.getvalue()
+            self._local.request = None
+            self.requests.append(request)
+
+    @contextmanager
+    def span(self, name):
+        """Adds the time spent in this block to the stage name.
+        """
+        request = self.current()
+        if request is None:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            request.add_span(name, time.time() - start)
+
+    def count(self, name, value=1):
+        """Increases the counter name of the running request.
+        """
+        request = self.current()
+        if request is not None:
+            request.counters[name] = request.counters.get(name, 0) + value
+
+    def error(self):
+        """Records the exception handled right now.
+        """
+        self.errors += 1
+        request = self.current()
+        if request is not None:
+            request.error = traceback.format_exc()
+
+    def clear(self):
+        """Forgets every recorded request.
+        """
+        self.requests.clear()
+        self.errors = 0
+
+    def as_dict(self):
+        """Returns all statistics as JSON serializable dictionary.
+        """
+        with cache.LOCK:
+            return self._as_dict()
+
+    def _as_dict(self):
+        """See as_dict, called while holding the lock.
+        """
+        return {
+            'requests': [request.as_dict() for request in self.requests],
+            'errors': self.errors,
+            'caches': dict((name, {'hits': node_cache.hits,
+                                   'misses': node_cache.misses,
+                                   'entries': len(node_cache)})
+                           for name, node_cache
+                           in cache.NAMED_CACHES.iteritems()),
+        }
+
+    def dump(self, path):
+        """Writes the statistics as JSON to the file path.
+        """
+        dump(self.as_dict(), path)
+
+    def summary(self):
+        """Returns a short human readable summary.
+        """
+        return summarize(self.as_dict())
+
+
+def dump(stats, path):
+    """Writes the statistics dictionary as JSON to the file path.
+    """
+    stats_file = open(path, 'w')
+    try:
+        json.dump(stats, stats_file, indent=2, sort_keys=True)
+    finally:
+        stats_file.close()
+
+
+def summarize(stats):
+    """Returns a human readable summary of the statistics dictionary.
+    """
+    requests = stats['requests']
+    lines = ['%d requests, %d errors' % (len(requests), stats['errors'])]
+    if requests:
+        last = requests[-1]
+        lines.append('last %s: %.1f ms' % (last['name'],
+                                           last['duration_ms']))
+        for name, span in sorted(last['spans'].iteritems(),
+                                 key=lambda item: -item[1]['total_ms']):
+            lines.append('  %-16s %8.1f ms %5dx' % (name, span['total_ms'],
+                                                    span['count']))
+        for name, value in sorted(last['counters'].iteritems()):
+            lines.append('  %-16s %8d' % (name, value))
+        durations = sorted(request['duration_ms'] for request in requests)
+        lines.append('median %.1f ms, max %.1f ms' % (
+            durations[len(durations) // 2], durations[-1]))
+    for name, counters in sorted(stats['caches'].iteritems()):
+        lines.append('cache %-28s %6d hits %6d misses %6d entries' % (
+            name, counters['hits'], counters['misses'], counters['entries']))
+    return '\n'.join(lines)
+
+
+STATS = Stats()
@@ -0,0 +1,125 @@
+"""Hands python values to Vim.
+
+Formatting a value with ``%s`` or ``%r`` into a Vim command makes Vim parse
+a python repr, which is slow for big lists and wrong for some strings, like
+unicode or a backslash before a quote.  ``let`` assigns a value to a Vim
+variable the fastest way the running Vim supports:
+
+* ``vim.bindeval``, the value is converted to a Vim list or dictionary
+  directly,
+* ``json_decode()`` of compact JSON,
+* an expression of properly escaped Vim literals.
+"""
+import json
+
+
+BINDEVAL = 'bindeval'
+JSON = 'json'
+LITERAL = 'literal'
+
+# Vim escapes of the characters which are not written as they are
+ESCAPES = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+
+def method(vim):
+    """Returns the best way to hand values to the Vim of the vim module.
+    """
+    if hasattr(vim, 'bindeval'):
+        return BINDEVAL
+    if int(vim.eval("exists('*json_decode')")):
+        return JSON
+    return LITERAL
+
+
+def vim_string(value, encoding='utf-8'):
+    """Returns value as double quoted Vim string literal.
+
+    Unicode is encoded with encoding, control characters are escaped.
+    """
+    if isinstance(value, unicode):
+        value = value.encode(encoding)
+    characters = []
+    for character in value:
+        if character in ESCAPES:
+            characters.append(ESCAPES[character])
+        elif ord(character) < 32 or ord(character) == 127:
+            characters.append('\\x%02x' % ord(character))
+        else:
+            characters.append(character)
+    return '"%s"' % ''.join(characters)
+
+
+def vim_literal(value, encoding='utf-8'):
+    """Returns a Vim expression of value.
+
+    Value may be a string, a number, None (an empty string) or a list or
+    dictionary of those.
+    """
+    if isinstance(value, basestring):
+        return vim_string(value, encoding)
+    if value is None:
+        return "''"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, long)):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, dict):
+        return '{%s}' % ','.join(
+            '%s:%s' % (vim_string(key if isinstance(key, basestring)
+                                  else str(key), encoding),
+                       vim_literal(item, encoding))
+            for key, item in value.iteritems())
+    return '[%s]' % ','.join(vim_literal(item, encoding) for item in value)
+
+
+def to_json(value, encoding='utf-8'):
+    """Returns value as compact, pure ASCII JSON.
+
+    Strings which are not valid in encoding are decoded with replacements.
+    """
+    def decoded(value):
+        if isinstance(value, str):
+            return value.decode(encoding, 'replace')
+        if isinstance(value, dict):
+            return dict((decoded(key), decoded(item))
+                        for key, item in value.iteritems())
+        if isinstance(value, (list, tuple)):
+            return [decoded(item) for item in value]
+        return value
+    return json.dumps(decoded(value), separators=(',', ':'))
+
+
+def bindable(value, encoding='utf-8'):
+    """Returns value with the types ``vim.bindeval`` objects accept.
+    """
+    if isinstance(value, unicode):
+        return value.encode(encoding)
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, dict):
+        return dict((bindable(key, encoding), bindable(item, encoding))
+                    for key, item in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return [bindable(item, encoding) for item in value]
+    return value
+
+
+def let(vim, name, value, encoding='utf-8'):
+    """Assigns value to the Vim variable name, like ``l:result``.
+
+    The name has to have a scope prefix.  Returns the method used.
+    """
+    used = method(vim)
+    if used == BINDEVAL:
+        scope, _, key = name.partition(':')
+        vim.bindeval(scope + ':')[key] = bindable(value, encoding)
+    elif used == JSON:
+        vim.command('let %s = json_decode(%s)' % (
+            name, vim_string(to_json(value, encoding))))
+    else:
+        vim.command('let %s = %s' % (name, vim_literal(value, encoding)))
+    return used
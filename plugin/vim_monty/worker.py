@@ -0,0 +1,184 @@
+"""Runs completions on a worker thread, so slow requests do not block Vim.
+
+A request waits at most its time budget for the completion, the parsing
+and the inference run on the worker.  If the inference is not finished in
+time, the names of the scope at the cursor are returned, the worker
+calculates them first.  A newer request of the same buffer cancels the
+older one, a running request stops after its current stage and page of
+entries.
+"""
+from threading import Condition, Event, Thread
+
+from vim_monty import cache
+from vim_monty import cursor_context
+from vim_monty import source
+from vim_monty.logger import log
+from vim_monty.stats import STATS
+
+
+# the queued requests survive reload_submodules
+KEEP_ON_RELOAD = True
+
+
+class CompletionRequest(object):
+    """A completion request handled by the worker.
+    """
+    def __init__(self, file_state, base='', completion_builder=None,
+                 limit=None, start=0):
+        self.file_state = file_state
+        self.base = base
+        self.completion_builder = completion_builder
+        self.limit = limit
+        self.start = start
+        self.cancelled = False
+        self.partial = None
+        self.result = None
+        self._done = Event()
+
+    def cancel(self):
+        """Marks the request as cancelled, the worker drops it.
+        """
+        self.cancelled = True
+        self._done.set()
+
+    def finish(self, result):
+        """Sets the result and wakes up the waiting thread.
+        """
+        self.result = result
+        self._done.set()
+
+    def wait(self, budget=None):
+        """Returns the result, or the partial result after budget seconds.
+        """
+        self._done.wait(budget)
+        if self.result is not None:
+            return self.result
+        return self.partial or []
+
+    def run_partial(self):
+        """Calculates the partial result, the names of the scope.
+
+        The partial result stays None outside of code without a context.
+        """
+        file_state = self.file_state
+        with cache.LOCK:
+            try:
+                context = file_state.cursor_context()
+                if (context.kind == cursor_context.CODE and
+                    not context.context_string):
+                    self.partial = source.completion_entries(
+                        file_state.scope_accessibles(), file_state, self.base,
+                        self.completion_builder, limit=self.limit,
+                        start=self.start)
+            except Exception, exc:
+                log(exc)
+
+    def run(self):
+        """Calculates the result of this request, unless it is cancelled.
+
+        The partial result is calculated first.  The lock of the analysis
+        state is released between the stages and the pages of entries, a
+        cancelled request stops there.
+        """
+        file_state = self.file_state
+        page_size = min(self.limit or source.PAGE_SIZE, source.PAGE_SIZE)
+        with STATS.request('completion'):
+            try:
+                self.run_partial()
+                if self.cancelled:
+                    return
+                with cache.LOCK:
+                    accessibles = source.request_accessibles(file_state)
+                pages = source.entry_pages(accessibles, file_state, self.base,
+                                           self.completion_builder, page_size,
+                                           start=self.start)
+                entries = []
+                while self.limit is None or len(entries) < self.limit:
+                    if self.cancelled:
+                        return
+                    with cache.LOCK:
+                        page = next(pages, None)
+                    if page is None:
+                        break
+                    entries.extend(page)
+            except Exception, exc:
+                source.request_failed(exc)
+                entries = []
+        if not self.cancelled:
+            self.finish(entries[:self.limit])
+
+
+class CompletionWorker(object):
+    """A thread handling the completion requests one after another.
+
+    Only the newest request of every buffer is kept.
+    """
+    def __init__(self):
+        self._condition = Condition()
+        self._pending = []
+        self._running = None
+        self._thread = None
+
+    def submit(self, request):
+        """Queues the request and cancels older requests of its buffer.
+        """
+        buffer_id = request.file_state.buffer_id
+        self._condition.acquire()
+        try:
+            for pending in self._pending[:]:
+                if pending.file_state.buffer_id == buffer_id:
+                    pending.cancel()
+                    self._pending.remove(pending)
+            running = self._running
+            if running is not None and \
+               running.file_state.buffer_id == buffer_id:
+                running.cancel()
+            self._pending.append(request)
+            if self._thread is None or not self._thread.isAlive():
+                self._thread = Thread(target=self._work)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        finally:
+            self._condition.release()
+        return request
+
+    def _next_request(self):
+        """Waits for the next request and returns it.
+        """
+        self._condition.acquire()
+        try:
+            self._running = None
+            while not self._pending:
+                self._condition.wait()
+            self._running = self._pending.pop(0)
+            return self._running
+        finally:
+            self._condition.release()
+
+    def _work(self):
+        """The loop of the worker thread.
+        """
+        while True:
+            request = self._next_request()
+            if request.cancelled:
+                continue
+            try:
+                request.run()
+            except Exception, exc:
+                log(exc)
+                request.finish([])
+
+
+WORKER = CompletionWorker()
+
+
+def completion(src, line, lineno, column, base, completion_builder=None,
+               buffer_id=None, limit=None, start=0, budget=1.0):
+    """Like vim_monty.completion, but waits at most budget seconds.
+    """
+    file_state = source.FileState(line, src, lineno, column, buffer_id)
+    request = CompletionRequest(file_state, base, completion_builder, limit,
+                                start)
+    WORKER.submit(request)
+    return request.wait(budget)
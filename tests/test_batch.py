@@ -0,0 +1,64 @@
+"""Test of the batch completion.
+"""
+# pylint: disable-msg=C0111
+import os
+import sys
+
+from vim_monty import batch
+from vim_monty import completion
+from vim_monty import completion_builders
+from vim_monty.stats import STATS
+
+
+HERE = os.path.dirname(__file__)
+FIXTURES = os.path.join(HERE, 'fixtures')
+sys.path.append(FIXTURES)
+A_MODULE = os.path.join(FIXTURES, 'a_module.py')
+B_MODULE = os.path.join(FIXTURES, 'b_module.py')
+SOURCE = open(A_MODULE).read()
+
+QUERIES = [
+    (A_MODULE, 18, 15),  # A_INSTANCE = AC|lass()
+    (B_MODULE, 5, 16),   # self._b_|attr = 1
+    (A_MODULE, 20, 12),  # A_CLASS = AC|lass
+    (A_MODULE, 1, 7),    # from b_|module import BClass
+    (A_MODULE, 12, 14),  # self._|instance_attr = 1.4
+]
+
+
+def test_group_by_file():
+    groups = batch.group_by_file(QUERIES)
+    assert [A_MODULE, B_MODULE] == [path for path, _ in groups]
+    assert [QUERIES[0], QUERIES[2], QUERIES[3], QUERIES[4]] == groups[0][1]
+
+
+def test_batch_completion():
+    results = list(batch.batch_completion(QUERIES))
+    assert 5 == len(results)
+    results = dict(results)
+    assert ['AClass'] == results[QUERIES[0]]
+    assert results[QUERIES[0]] == results[QUERIES[2]]
+    assert 'b_module' in results[QUERIES[3]]
+    assert '_instance_attr' in results[QUERIES[4]]
+    assert ['_b_attr'] == results[QUERIES[1]]
+    assert completion(SOURCE, 'A_INSTANCE = AClass()', 18, 13, 'AC') == \
+        results[QUERIES[0]]
+
+
+def test_processes():
+    builder = completion_builders.vim_completion_builder
+    results = dict(batch.batch_completion(QUERIES, builder, processes=2))
+    assert ['AClass('] == [entry['word'] for entry in results[QUERIES[0]]]
+    assert 5 == len(results)
+
+
+def test_unreadable_file():
+    query = (os.path.join(FIXTURES, 'missing.py'), 1, 1)
+    assert [(query, [])] == list(batch.batch_completion([query]))
+
+
+def test_batch_stats():
+    STATS.clear()
+    list(batch.batch_completion(QUERIES[:2]))
+    assert ['completion', 'completion'] == [request.name
+                                            for request in STATS.requests]
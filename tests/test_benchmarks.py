@@ -0,0 +1,25 @@
+"""Smoke test of the benchmark suite.
+"""
+# pylint: disable-msg=C0111
+import os
+import sys
+
+from logilab.astng import MANAGER
+
+HERE = os.path.dirname(__file__)
+sys.path.append(os.path.join(HERE, '..', 'benchmarks'))
+
+import bench_completion
+
+
+def test_run():
+    result = bench_completion.run(repeat=1, scale=1)
+    assert 4 == len(result['results'])
+    for stages in result['results'].itervalues():
+        assert sorted(bench_completion.STAGES) == sorted(stages)
+    assert bench_completion.BIG_MODULE not in MANAGER.astng_cache
+    assert [] == bench_completion.compare(result, result)
+    slower = dict(result, results={'large_module': {'parse': {'min': 0}}})
+    assert [] == bench_completion.compare(slower, result)
+    faster = dict(result, results={'large_module': {'parse': {'min': 1e-9}}})
+    assert 1 == len(bench_completion.compare(faster, result))
@@ -0,0 +1,94 @@
+"""Test of the caches of data derived from astng elements.
+"""
+# pylint: disable-msg=C0111
+import sys
+
+from logilab.astng.builder import MANAGER
+
+from vim_monty.cache import NodeCache
+from vim_monty.incremental import IncrementalBuilder
+from vim_monty.language_elements import INFERRED, LanguageElement
+from vim_monty.language_elements import node_lines
+
+
+SOURCE_LINES = [
+    'class AClass(object):',
+    '    pass',
+    'A_INSTANCE = AClass()',
+    'A_NAME = A_INSTANCE',
+]
+
+
+def test_lru():
+    module = IncrementalBuilder().build(SOURCE_LINES)
+    a_cache = NodeCache(max_entries=2)
+    a_cache.set(module, 1, extra=1)
+    a_cache.set(module, 2, extra=2)
+    assert 1 == a_cache.get(module, extra=1)
+    a_cache.set(module, 3, extra=3)
+    assert 2 == len(a_cache)
+    assert a_cache.get(module, extra=2) is None
+    assert 1 == a_cache.get(module, extra=1)
+
+
+def test_weight():
+    module = IncrementalBuilder().build(SOURCE_LINES)
+    a_cache = NodeCache(max_weight=5, weigh=len)
+    a_cache.set(module, 'abc', extra=1)
+    a_cache.set(module, 'de', extra=2)
+    assert 5 == a_cache.weight
+    a_cache.set(module, 'f', extra=3)
+    assert a_cache.get(module, extra=1) is None
+    assert 3 == a_cache.weight
+
+
+def test_inferred_weight():
+    module = IncrementalBuilder().build(SOURCE_LINES)
+    assert len(SOURCE_LINES) == node_lines(module)
+    assert 2 == node_lines(module['AClass'])
+    assert 1 == node_lines(None)
+    INFERRED.clear()
+    name = LanguageElement.create(module['A_NAME'], name='A_NAME')
+    name.infer()
+    assert 2 == INFERRED.weight
+
+
+def test_generation():
+    builder = IncrementalBuilder()
+    module = builder.build(SOURCE_LINES, 'buffer')
+    a_class = module['AClass']
+    a_cache = NodeCache()
+    a_cache.set(a_class, 'value')
+    assert 'value' == a_cache.get(a_class)
+    builder.build(SOURCE_LINES[:-1], 'buffer')
+    assert a_class is module['AClass']
+    assert a_cache.get(a_class) is None
+
+
+def test_infer():
+    module = IncrementalBuilder().build(SOURCE_LINES)
+    name = LanguageElement.create(module.locals['A_NAME'][0], 'A_NAME')
+    infered = name.infer()
+    assert infered is name.infer()
+    assert infered.get_class() is infered.get_class()
+    assert 'AClass' == infered.get_class().name()
+
+
+def test_infer_through_modules(tmpdir):
+    tmpdir.join('cache_mid.py').write('from cache_low import Thing\n'
+                                      'value = Thing()\n')
+    tmpdir.join('cache_low.py').write('class Thing(object):\n    pass\n')
+    sys.path.insert(0, str(tmpdir))
+    try:
+        module = IncrementalBuilder().build(['import cache_mid',
+                                             'X = cache_mid.value'])
+        name = LanguageElement.create(module.locals['X'][0], 'X')
+        infered = name.infer()
+        assert infered is name.infer()
+        # a new parse of the module passed by the inference drops the result
+        MANAGER.astng_cache['cache_mid'].monty_generation = -1
+        assert infered is not name.infer()
+    finally:
+        sys.path.remove(str(tmpdir))
+        for module_name in ('cache_mid', 'cache_low'):
+            MANAGER.astng_cache.pop(module_name, None)
@@ -4,7 +4,11 @@
 import os
 import sys
 
-from vim_monty import completion
+from vim_monty import completion, completion_pages
+from vim_monty import module_index
+from vim_monty import source
+from vim_monty import vim_completion_builder
+from vim_monty.stats import STATS
 
 
 HERE = os.path.dirname(__file__)
@@ -98,11 +102,30 @@ def test_builtin():
 
 
 PACKAGE_MODULES = [
+  'batch',
+  'cache',
+  'client',
   'completion_builders',
   'completionable',
+  'cursor_context',
+  'definition',
+  'dependencies',
+  'disk_cache',
+  'incremental',
+  'inheritance',
   'language_elements',
   'logger',
+  'module_index',
+  'prefix_index',
+  'prewarm',
+  'project_index',
+  'repair',
+  'server',
+  'snapshot',
   'source',
+  'stats',
+  'vim_values',
+  'worker',
 ]
 
 
@@ -121,8 +144,111 @@ def test_from_line():
     compls = completion('\n\n', line, 1, len(line), '')
     expect = sorted(PACKAGE_MODULES + [
                     'completion',
+                    'completion_pages',
                     'find_base_column',
                     'reload_submodules',
                     'vim_completion_builder',
     ])
     assert expect == compls
+
+
+def test_buffer_id():
+    for linenumber in (16, 17, 16, 27):
+        compls = completion(AModule.SOURCE, '        ', linenumber, 8, '',
+                            buffer_id='a_module')
+        assert AModule.completion('        ', linenumber) == compls
+
+
+def test_enclosing_accessibles():
+    from vim_monty.source import PyModule
+    module = PyModule.by_source(AModule.SOURCE, 16, cache_key='enclosing')
+    scope = module.scope(16)
+    accessibles = scope.free_accessibles()
+    parent_accessibles = scope.parent().enclosing_accessibles()
+    assert parent_accessibles == scope.parent().enclosing_accessibles()
+    assert (sorted(accessible.name() for accessible in accessibles) ==
+            AModule.completion('        ', 16))
+    for cached, again in zip(parent_accessibles,
+                             scope.parent().enclosing_accessibles()):
+        assert cached is again
+
+
+def test_deferred_entries():
+    python_code = 'from b_module import BClass\nfrom a_module import AClass\n\n'
+    file_state = source.FileState('', python_code, 3, 0)
+    accessibles = file_state.accessibles()
+    entries = source.completion_entries(accessibles, file_state, '',
+                                        vim_completion_builder, 1)
+    assert [('AClass(', 'c'), ('BClass', '?')] == \
+        [(entry['word'], entry['kind']) for entry in entries]
+    # the import of AClass is cached now, so it doesn't count as deferred
+    entries = source.completion_entries(accessibles, file_state, '',
+                                        vim_completion_builder, 1)
+    assert [('AClass(', 'c'), ('BClass(', 'c')] == \
+        [(entry['word'], entry['kind']) for entry in entries]
+
+
+def test_limit_and_pages():
+    compls = AModule.completion('')
+    line = AModule.LAST_LINE
+    assert compls[:3] == completion(AModule.SOURCE, '', line, 0, '', limit=3)
+    pages = list(completion_pages(AModule.SOURCE, '', line, 0, '',
+                                  page_size=3))
+    assert [3, 3, 1] == [len(page) for page in pages]
+    assert compls == sum(pages, [])
+    assert compls[3:6] == completion(AModule.SOURCE, '', line, 0, '',
+                                     limit=3, start=3)
+    assert compls[6:] == completion(AModule.SOURCE, '', line, 0, '',
+                                    start=6)
+
+
+def test_pages_request():
+    line = AModule.LAST_LINE
+    STATS.clear()
+    pages = completion_pages(AModule.SOURCE, '', line, 0, '', page_size=3)
+    next(pages)
+    assert 0 == len(STATS.requests)
+    list(pages)
+    assert 1 == len(STATS.requests)
+    assert [] == list(completion_pages(AModule.SOURCE, '', line, 0, '',
+                                       'not a builder'))
+    assert 1 == STATS.errors
+
+
+def test_multi_line_statement():
+    python_code = 'from a_module import (AClass,\n    A_)\n'
+    compls = completion(python_code, '    A_)', 2, 4, 'A_')
+    assert ['A_CLASS', 'A_DICTIONARY', 'A_INSTANCE', 'A_INTEGER',
+            'A_STRING'] == compls
+    assert [] == AModule.completion('x = 1  # A_CLASS.')
+
+
+def test_from_import_new_module(tmpdir):
+    package = tmpdir.mkdir('grown_package')
+    package.join('__init__.py').write('')
+    package.join('old.py').write('')
+    sys.path.insert(0, str(tmpdir))
+    try:
+        line = 'from grown_package import '
+        assert 'old' in completion(line, line, 1, len(line), '')
+        package.join('new.py').write('')
+        module_index.INDEX.index(str(package))
+        assert 'new' in completion(line, line, 1, len(line), '')
+    finally:
+        sys.path.remove(str(tmpdir))
+
+
+def test_failed_import_cached():
+    python_code = 'from not_a_module import Name\n\n'
+    file_state = source.FileState('', python_code, 3, 0)
+    accessibles = file_state.accessibles()
+    imported = [accessible for accessible in accessibles
+                if accessible.name() == 'Name'][0]
+    assert imported.is_deferred()
+    entries = source.completion_entries(accessibles, file_state, 'Nam',
+                                        vim_completion_builder)
+    assert [('Name', '?')] == [(entry['word'], entry['kind'])
+                               for entry in entries]
+    assert not imported.is_deferred()
+    module_index.INDEX.version += 1
+    assert imported.is_deferred()
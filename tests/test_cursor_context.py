@@ -0,0 +1,62 @@
+"""Test of the classification of the cursor position.
+"""
+# pylint: disable-msg=C0111
+from vim_monty import cursor_context
+from vim_monty.cursor_context import (
+    analyze, base_column, CODE, COMMENT, FROM_IMPORT, IMPORT_PATH,
+    NEED_IMPORT, STRING)
+
+
+def context_of(source):
+    """Analyzes source, the cursor is at the end of its last line.
+    """
+    lines = source.split('\n')
+    return analyze(lines, len(lines), lines[-1], len(lines[-1]))
+
+
+def test_base_column():
+    assert 3 == base_column('os.pa', 5)
+    assert 4 == base_column('foo+ba', 6)
+    assert 1 == base_column('\tname', 5)
+    assert 0 == base_column('', 0)
+
+
+def test_single_line():
+    context = context_of('x = os.path.')
+    assert (CODE, 'os.path') == (context.kind, context.context_string)
+    assert IMPORT_PATH == context_of('import os.').kind
+    assert IMPORT_PATH == context_of('from os.').kind
+    assert NEED_IMPORT == context_of('from os ').kind
+    context = context_of('from os import pa')
+    assert (FROM_IMPORT, 'os') == (context.kind, context.import_path)
+    assert CODE == context_of('x = 1; y.').kind
+
+
+def test_strings_and_comments():
+    assert STRING == context_of('x = "os.').kind
+    assert STRING == context_of("x = 'it\\'s os.").kind
+    assert CODE == context_of('x = "a#b" + os.').kind
+    assert COMMENT == context_of('x = 1  # os.').kind
+    assert STRING == context_of('x = """os.').kind
+    context = context_of('x = """\nos.path\n"""\nos.')
+    assert (CODE, 'os') == (context.kind, context.context_string)
+
+
+def test_multi_line():
+    context = context_of('from os import (path,\n                sep,\n    cu')
+    assert (FROM_IMPORT, 'os') == (context.kind, context.import_path)
+    context = context_of('from os import \\\n    pa')
+    assert (FROM_IMPORT, 'os') == (context.kind, context.import_path)
+    context = context_of('x = call(\n    a,\n    os.')
+    assert (CODE, 'os') == (context.kind, context.context_string)
+    context = context_of('import os\nos.')
+    assert (CODE, 'os') == (context.kind, context.context_string)
+
+
+def test_statement_start():
+    lines = ['def query():', '    sql = """', 'SELECT a', '"""', '    x.']
+    assert 4 == cursor_context.statement_start(lines, 4, lines[4])
+    lines = ['x = call(', '    """doc', '    text', '    """, os.']
+    assert 0 == cursor_context.statement_start(lines, 3, lines[3])
+    context = analyze(lines, 4, lines[3], len(lines[3]))
+    assert (CODE, 'os') == (context.kind, context.context_string)
@@ -0,0 +1,79 @@
+"""Test of go-to-definition.
+"""
+# pylint: disable-msg=C0111
+import os
+import sys
+
+from vim_monty import definition
+from vim_monty import project_index
+
+
+HERE = os.path.dirname(__file__)
+FIXTURES = os.path.join(HERE, 'fixtures')
+sys.path.append(FIXTURES)
+SOURCE = open(os.path.join(FIXTURES, 'a_module.py')).read()
+B_MODULE = os.path.join(FIXTURES, 'b_module.py')
+
+
+def test_dotted_name():
+    assert 'os.path.join' == definition.dotted_name('x = os.path.join(a)', 13)
+    assert 'os.path' == definition.dotted_name('x = os.path.join(a)', 8)
+    assert 'AClass' == definition.dotted_name('AClass()', 0)
+    assert '' == definition.dotted_name('  ', 1)
+
+
+def test_buffer_definition():
+    line = 'A_INSTANCE = AClass()'
+    assert (None, 8) == definition.definition(SOURCE, line, 18, 15)
+    assert (None, 14) == definition.definition(SOURCE, 'A_CLASS.a_method',
+                                               20, 10)
+
+
+def test_imported_definition():
+    line = 'from b_module import BClass'
+    path, linenumber = definition.definition(SOURCE, line, 1, 23)
+    assert os.path.samefile(B_MODULE, path.replace('.pyc', '.py'))
+    assert 3 == linenumber
+
+
+def test_cached():
+    line = 'A_INSTANCE = AClass()'
+    result = definition.definition(SOURCE, line, 18, 15, buffer_id='def')
+    assert result is definition.definition(SOURCE, line, 18, 15,
+                                           buffer_id='def')
+
+
+def test_project_index(tmpdir):
+    tmpdir.join('indexed.py').write('\n\ndef not_imported():\n    pass\n')
+    index_file = str(tmpdir.join('project.index'))
+    index = project_index.ProjectIndex(str(tmpdir), index_file)
+    index.update(processes=1)
+    index.save()
+    source = 'not_imported()\n'
+    assert definition.definition(source, source, 1, 3) is None
+    definition.load_project_index(str(tmpdir), index_file)
+    try:
+        assert (str(tmpdir.join('indexed.py')), 3) == \
+            definition.definition(source, source, 1, 3)
+    finally:
+        definition.PROJECT_INDEX[:] = [None, None]
+
+
+def test_cached_miss():
+    source = 'undefined_name()\n'
+    assert definition.definition(source, source, 1, 3, 'miss') is None
+    module = definition.build_module(source, 1, 'miss')
+    scope = module.scope(1)
+    assert definition.NOT_FOUND == definition.DEFINITIONS.get(
+        scope.astng_element, extra='undefined_name')
+
+
+def test_broken_line_keeps_buffer():
+    builder = definition.PyModule.INCREMENTAL_BUILDER
+    source_lines = SOURCE.splitlines()
+    module = builder.build(source_lines, 'broken')
+    lines = list(source_lines)
+    lines[17] = 'A_INSTANCE = AClass('
+    assert (None, 8) == definition.definition('\n'.join(lines), lines[17],
+                                              18, 15, buffer_id='broken')
+    assert module is builder.build(source_lines, 'broken')
@@ -0,0 +1,86 @@
+"""Test of the invalidation of modules whose files changed.
+"""
+# pylint: disable-msg=C0111
+import os
+import sys
+
+from logilab.astng.builder import MANAGER
+
+from vim_monty import dependencies
+from vim_monty.incremental import UnregisteredBuilder
+
+
+def write_modules(directory):
+    directory.join('dep_base.py').write('class Base(object):\n    pass\n')
+    directory.join('dep_user.py').write('import dep_base\n')
+    directory.join('dep_star.py').write('from dep_user import *\n')
+    directory.join('dep_other.py').write('import os\n')
+
+
+def test_invalidate_importers(tmpdir):
+    write_modules(tmpdir)
+    sys.path.insert(0, str(tmpdir))
+    names = ['dep_base', 'dep_user', 'dep_star', 'dep_other']
+    try:
+        modules = [MANAGER.astng_from_module_name(name) for name in names]
+        graph = dependencies.DependencyGraph()
+        assert graph.check(force=True) == set()
+        assert graph.importers('dep_base') == set(['dep_user'])
+        base_path = str(tmpdir.join('dep_base.py'))
+        stat = os.stat(base_path)
+        os.utime(base_path, (stat.st_atime, stat.st_mtime + 10))
+        assert graph.check() == set()
+        assert graph.check(force=True) == set(names[:3])
+        for name in names[:3]:
+            assert name not in MANAGER.astng_cache
+        assert MANAGER.astng_cache['dep_other'] is modules[3]
+        assert getattr(modules[0], 'monty_generation', None) is not None
+        assert graph.check(force=True) == set()
+    finally:
+        sys.path.remove(str(tmpdir))
+        for name in names:
+            MANAGER.astng_cache.pop(name, None)
+
+
+def test_imported_names():
+    module = MANAGER.astng_from_module_name('vim_monty.source')
+    names = dependencies.imported_names(module)
+    assert 'logilab.astng.builder' in names
+    assert 'bisect' in names
+    assert 'vim_monty.language_elements' in names
+
+
+def test_track_replaces_imports():
+    graph = dependencies.DependencyGraph()
+    module = MANAGER.astng_from_module_name('vim_monty.worker')
+    graph.track(module)
+    assert 'vim_monty.worker' in graph.importers('vim_monty.cursor_context')
+    reparsed = UnregisteredBuilder().string_build('import os\n',
+                                                  'vim_monty.worker')
+    reparsed.file = module.file
+    graph.track(reparsed)
+    assert 'vim_monty.worker' not in \
+        graph.importers('vim_monty.cursor_context')
+    assert set(['vim_monty.worker']) == graph.importers('os')
+
+
+def test_library_interval(tmpdir):
+    packages = tmpdir.mkdir('site-packages')
+    packages.join('dep_library.py').write('import os\n')
+    sys.path.insert(0, str(packages))
+    try:
+        MANAGER.astng_from_module_name('dep_library')
+        graph = dependencies.DependencyGraph()
+        assert graph.check(force=True) == set()
+        path = str(packages.join('dep_library.py'))
+        assert dependencies.is_library(path)
+        assert dependencies.is_library(os.__file__)
+        assert not dependencies.is_library(__file__)
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        assert graph.check(force=True) == set()
+        graph.LIBRARY_INTERVAL = 0
+        assert graph.check(force=True) == set(['dep_library'])
+    finally:
+        sys.path.remove(str(packages))
+        MANAGER.astng_cache.pop('dep_library', None)
@@ -0,0 +1,69 @@
+"""Test of the persistent module cache.
+"""
+# pylint: disable-msg=C0111
+import os
+
+from logilab.astng.builder import MANAGER
+
+from vim_monty import disk_cache
+from vim_monty.incremental import UnregisteredBuilder
+
+
+HERE = os.path.dirname(__file__)
+FIXTURES = os.path.join(HERE, 'fixtures')
+A_MODULE = os.path.join(FIXTURES, 'a_module.py')
+
+
+def test_store_and_load(tmpdir):
+    cache = disk_cache.ModuleCache(str(tmpdir))
+    module = MANAGER.astng_from_file(A_MODULE, 'a_module')
+    cache.store(A_MODULE, module)
+    loaded = cache.load(A_MODULE, 'a_module')
+    assert loaded is not module
+    assert sorted(module.locals) == sorted(loaded.locals)
+    assert 'a_method' in loaded['AClass'].locals
+    assert loaded['AClass'].parent is loaded
+    assert cache.load(A_MODULE, 'other_name') is None
+
+
+def test_stale(tmpdir):
+    module_file = tmpdir.join('a_module.py')
+    module_file.write(open(A_MODULE).read())
+    path = str(module_file)
+    cache = disk_cache.ModuleCache(str(tmpdir.mkdir('cache')))
+    module = UnregisteredBuilder().string_build(module_file.read(),
+                                                'a_module', path)
+    cache.store(path, module)
+    assert cache.load(path, 'a_module') is not None
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert cache.load(path, 'a_module') is None
+
+
+def test_class_reference(tmpdir):
+    cache = disk_cache.ModuleCache(str(tmpdir))
+    module = UnregisteredBuilder().string_build(open(A_MODULE).read(),
+                                                'a_module', A_MODULE)
+    b_class = MANAGER.astng_from_module_name('b_module')['BClass']
+    module.referenced = [b_class, b_class['b_class_method']]
+    cache.store(A_MODULE, module)
+    loaded = cache.load(A_MODULE, 'a_module')
+    assert loaded.referenced[0] is b_class
+    assert loaded.referenced[1] is b_class['b_class_method']
+    assert loaded['AClass'] is not module['AClass']
+    assert ('BClass',) == disk_cache.scope_path(b_class)
+
+
+def test_manager(tmpdir):
+    disk_cache.configure(str(tmpdir))
+    try:
+        MANAGER.astng_cache.pop('b_module', None)
+        module = MANAGER.astng_from_module_name('b_module')
+        assert 1 == len(tmpdir.listdir())
+        MANAGER.astng_cache.pop('b_module')
+        loaded = MANAGER.astng_from_module_name('b_module')
+        assert loaded is not module
+        assert loaded is MANAGER.astng_cache['b_module']
+        assert 'b_class_method' in loaded['BClass'].locals
+    finally:
+        disk_cache.configure(None)
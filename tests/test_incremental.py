@@ -0,0 +1,104 @@
+"""Test of the incremental module building.
+"""
+# pylint: disable-msg=C0111
+from logilab.astng.builder import MANAGER
+
+from vim_monty.incremental import IncrementalBuilder
+
+
+SOURCE_LINES = [
+    'import os',
+    '',
+    'A_CONSTANT = 1',
+    '',
+    'class AClass(object):',
+    '    def a_method(self):',
+    '        self.an_attr = 1',
+    '',
+    '@staticmethod',
+    'def a_function(arg):',
+    '    a_var = arg',
+    '',
+    'B_CONSTANT = 2',
+]
+
+
+def build_twice(new_lines):
+    builder = IncrementalBuilder()
+    old_module = builder.build(SOURCE_LINES, 'buffer')
+    old_body = list(old_module.body)
+    module = builder.build(new_lines, 'buffer')
+    return old_body, module
+
+
+def assert_like_full_build(module, lines):
+    full_module = IncrementalBuilder().build(lines)
+    assert sorted(full_module.locals) == sorted(module.locals)
+    assert ([(statement.fromlineno, statement.tolineno)
+             for statement in full_module.body] ==
+            [(statement.fromlineno, statement.tolineno)
+             for statement in module.body])
+    assert full_module.tolineno == module.tolineno
+
+
+def test_unchanged():
+    old_body, module = build_twice(SOURCE_LINES)
+    assert old_body == module.body
+
+
+def test_change_function_body():
+    lines = list(SOURCE_LINES)
+    lines[10] = '    b_var = arg'
+    old_body, module = build_twice(lines)
+    assert_like_full_build(module, lines)
+    assert old_body[:3] == module.body[:3]
+    assert old_body[3] is not module.body[3]
+    assert old_body[4] is module.body[4]
+    assert 'b_var' in module['a_function'].locals
+    assert 'a_var' not in module['a_function'].locals
+
+
+def test_insert_lines():
+    lines = list(SOURCE_LINES)
+    lines[7:7] = ['    def b_method(self):', '        pass', '']
+    old_body, module = build_twice(lines)
+    assert_like_full_build(module, lines)
+    assert old_body[-1] is module.body[-1]
+    assert module['B_CONSTANT'].fromlineno == 16
+    a_class = module['AClass']
+    assert 'b_method' in a_class.locals
+    assert 'an_attr' in a_class.instance_attrs
+
+
+def test_new_global():
+    lines = list(SOURCE_LINES)
+    lines[3] = 'C_CONSTANT = 3'
+    _old_body, module = build_twice(lines)
+    assert_like_full_build(module, lines)
+    assert module['C_CONSTANT'].parent.parent is module
+
+
+def test_syntax_error():
+    lines = list(SOURCE_LINES)
+    lines[10] = '    b_var = ('
+    builder = IncrementalBuilder()
+    module = builder.build(SOURCE_LINES, 'buffer')
+    try:
+        builder.build(lines, 'buffer')
+    except SyntaxError:
+        pass
+    else:
+        raise AssertionError('SyntaxError expected')
+    # the remembered build is kept for the next build
+    assert module is builder.build(SOURCE_LINES, 'buffer')
+
+
+def test_blocks_not_registered():
+    builder = IncrementalBuilder()
+    lines = list(SOURCE_LINES)
+    module = builder.build(lines, 'buffer')
+    lines[10] = '    b_var = 2'
+    MANAGER.astng_cache.pop('', None)
+    assert module is builder.build(lines, 'buffer')
+    assert '' not in MANAGER.astng_cache
+
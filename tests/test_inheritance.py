@@ -0,0 +1,63 @@
+"""Test of the member resolution along the method resolution order.
+"""
+# pylint: disable-msg=C0111
+from vim_monty.incremental import IncrementalBuilder
+from vim_monty import inheritance
+
+
+SOURCE_LINES = [
+    'class Base(object):',
+    '    def method(self):',
+    '        self.base_attr = 1',
+    '    def base_method(self):',
+    '        pass',
+    'class Left(Base):',
+    '    def method(self):',
+    '        pass',
+    'class Right(Base):',
+    '    def method(self):',
+    '        self.right_attr = 1',
+    '    def right_method(self):',
+    '        pass',
+    'class Child(Left, Right):',
+    '    pass',
+]
+
+
+def test_mro():
+    module = IncrementalBuilder().build(SOURCE_LINES)
+    names = [klass.name for klass in inheritance.mro(module['Child'])]
+    assert ['Child', 'Left', 'Right', 'Base', 'object'] == names
+
+
+def test_mro_reuses_bases():
+    module = IncrementalBuilder().build(SOURCE_LINES)
+    base_index = inheritance.member_index(module['Base'])
+    inheritance.member_index(module['Child'])
+    assert base_index is inheritance.member_index(module['Base'])
+    left_index = inheritance.member_index(module['Left'])
+    assert base_index.mro == left_index.mro[1:]
+
+
+def test_member_index():
+    module = IncrementalBuilder().build(SOURCE_LINES)
+    index = inheritance.member_index(module['Child'])
+    assert module['Left'] is index.members['method'][1]
+    assert module['Right'] is index.members['right_method'][1]
+    assert module['Base'] is index.members['base_method'][1]
+    assert '__init__' in index.members
+    assert ['right_attr', 'base_attr'] == list(index.instance_attributes)
+    assert index is inheritance.member_index(module['Child'])
+
+
+def test_invalidation():
+    builder = IncrementalBuilder()
+    module = builder.build(SOURCE_LINES, 'buffer')
+    child = module['Child']
+    index = inheritance.member_index(child)
+    lines = list(SOURCE_LINES)
+    lines[12] = '        self.new_attr = 1'
+    assert child is builder.build(lines, 'buffer')['Child']
+    new_index = inheritance.member_index(child)
+    assert new_index is not index
+    assert 'new_attr' in new_index.instance_attributes
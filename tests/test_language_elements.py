@@ -0,0 +1,14 @@
+"""Test of the language element classes.
+"""
+# pylint: disable-msg=C0111
+from vim_monty import language_elements
+from vim_monty.completionable import Completionable
+
+
+def test_slots():
+    for name, value in vars(language_elements).items():
+        if (isinstance(value, type) and
+            issubclass(value, Completionable)):
+            assert '__slots__' in vars(value), name
+            element = value(None, name='x')
+            assert not hasattr(element, '__dict__'), name
@@ -0,0 +1,50 @@
+"""Test of the index of modules on the disk.
+"""
+# pylint: disable-msg=C0111
+import os
+
+from vim_monty import completion
+from vim_monty.module_index import ModuleIndex
+
+
+def create_tree(tmpdir):
+    tmpdir.join('a_module.py').write('')
+    tmpdir.join('a_package').mkdir().join('__init__.py').write('')
+    tmpdir.join('no_package').mkdir()
+    tmpdir.join('data.txt').write('')
+
+
+def test_modules(tmpdir):
+    create_tree(tmpdir)
+    index = ModuleIndex()
+    assert set(['a_module', 'a_package']) == index.modules(str(tmpdir))
+
+
+def test_refresh(tmpdir):
+    create_tree(tmpdir)
+    index = ModuleIndex()
+    index.modules(str(tmpdir))
+    version = index.version
+    index.refresh()
+    assert version == index.version
+    tmpdir.join('no_package').join('__init__.py').write('')
+    index.refresh()
+    assert 'no_package' not in index.modules(str(tmpdir))
+    os.utime(str(tmpdir), (0, 0))
+    index.refresh()
+    assert 'no_package' in index.modules(str(tmpdir))
+    assert version != index.version
+
+
+def test_top_level_modules(tmpdir):
+    create_tree(tmpdir)
+    index = ModuleIndex()
+    index.paths = [str(tmpdir), str(tmpdir.join('missing'))]
+    assert set(['a_module', 'a_package']) == index.top_level_modules()
+
+
+def test_top_level_completion():
+    compls = completion('\n\n', 'import ', 1, 7, 'vim_mon')
+    assert ['vim_monty'] == compls
+    compls = completion('\n\n', 'from ', 1, 5, 'vim_mon')
+    assert ['vim_monty'] == compls
@@ -0,0 +1,48 @@
+"""Test of the prefix index and the sort order of completionables.
+"""
+# pylint: disable-msg=C0111
+from vim_monty.completionable import Completionable
+from vim_monty.prefix_index import MIN_INDEXED, PrefixIndex, index, matches
+
+
+NAMES = ['path', '__doc__', 'pardir', '_exit', 'sep', 'pathsep', 'a']
+
+
+def completionables():
+    return [Completionable(name) for name in NAMES]
+
+
+def test_sort_key():
+    elements = completionables()
+    elements.sort(key=lambda element: element.sort_key())
+    names = [element.name() for element in elements]
+    assert ['a', 'pardir', 'path', 'pathsep', 'sep', '_exit', '__doc__'] == \
+        names
+    assert names == [element.name() for element in sorted(completionables())]
+
+
+def test_startswith():
+    index = PrefixIndex(completionables())
+    assert len(NAMES) == len(index)
+    assert ['path', 'pathsep'] == [element.name()
+                                   for element in index.startswith('pat')]
+    assert [] == index.startswith('x')
+    assert len(NAMES) == len(index.startswith(''))
+
+
+def test_matches():
+    assert (['path', 'pathsep'] ==
+            sorted(element.name()
+                   for element in matches(completionables(), 'pat')))
+    assert (['__doc__', '_exit'] ==
+            [element.name()
+             for element in matches(PrefixIndex(completionables()), '_')])
+
+
+def test_index():
+    small = index(completionables())
+    assert tuple(completionables()) == small
+    big = index(Completionable('name_%d' % number)
+                for number in range(MIN_INDEXED))
+    assert isinstance(big, PrefixIndex)
+    assert MIN_INDEXED == len(big)
@@ -0,0 +1,41 @@
+"""Test of the pre-warming of the imports of a buffer.
+"""
+# pylint: disable-msg=C0111
+import sys
+
+from logilab.astng.builder import MANAGER
+
+from vim_monty import prewarm
+
+
+def test_depth_order(tmpdir):
+    tmpdir.join('warm_direct.py').write('import warm_indirect\n')
+    tmpdir.join('warm_indirect.py').write('import warm_too_deep\n')
+    tmpdir.join('warm_too_deep.py').write('X = 1\n')
+    sys.path.insert(0, str(tmpdir))
+    names = ['warm_direct', 'warm_indirect', 'warm_too_deep']
+    try:
+        prewarmer = prewarm.Prewarmer()
+        job = prewarm.Job('import warm_direct\nimport os\n', max_depth=2)
+        prewarmer._push(0, job, None)
+        MANAGER.astng_cache.pop('', None)
+        prewarmer.run_next()
+        assert '' not in MANAGER.astng_cache
+        assert [1, 1] == [depth for depth, _, _, _ in prewarmer._queue]
+        while prewarmer.pending():
+            prewarmer.run_next()
+        assert 'warm_direct' in MANAGER.astng_cache
+        assert 'warm_indirect' in MANAGER.astng_cache
+        assert 'warm_too_deep' not in MANAGER.astng_cache
+    finally:
+        sys.path.remove(str(tmpdir))
+        for name in names:
+            MANAGER.astng_cache.pop(name, None)
+
+
+def test_budget():
+    prewarmer = prewarm.Prewarmer()
+    job = prewarm.Job('import warm_expired\n', budget=-1)
+    prewarmer._push(0, job, None)
+    prewarmer.run_next()
+    assert 0 == prewarmer.pending()
@@ -0,0 +1,62 @@
+"""Test of the project symbol index.
+"""
+# pylint: disable-msg=C0111
+import os
+
+from vim_monty import project_index
+
+
+def write_project(root):
+    package = root.mkdir('package')
+    package.join('__init__.py').write('VERSION = 1\n')
+    package.join('module.py').write(
+        'import os\n\nclass AClass(object):\n    pass\n\n'
+        'def a_function():\n    pass\n')
+    root.mkdir('.git').join('hidden.py').write('HIDDEN = 1\n')
+
+
+def test_update(tmpdir):
+    write_project(tmpdir)
+    index = project_index.ProjectIndex(str(tmpdir))
+    assert 2 == index.update(processes=1)
+    module_path = str(tmpdir.join('package', 'module.py'))
+    assert [('AClass', 'c', 3), ('a_function', 'f', 6)] == \
+        index.entries[module_path][2]
+    assert [(module_path, 'f', 6)] == index.find('a_function')
+    assert [] == index.find('HIDDEN')
+    assert 0 == index.update(processes=1)
+
+    tmpdir.join('package', 'module.py').write('def other():\n    pass\n')
+    stat = os.stat(module_path)
+    os.utime(module_path, (stat.st_atime, stat.st_mtime + 10))
+    assert 1 == index.update(processes=1)
+    assert [] == index.find('a_function')
+    assert [(module_path, 'f', 1)] == index.find('other')
+
+
+def test_pool(tmpdir, monkeypatch):
+    write_project(tmpdir)
+    monkeypatch.setattr(project_index, 'POOL_THRESHOLD', 0)
+    index = project_index.ProjectIndex(str(tmpdir))
+    assert 2 == index.update(processes=2)
+    assert 1 == len(index.find('AClass'))
+
+
+def test_save_and_load(tmpdir):
+    write_project(tmpdir.mkdir('root'))
+    index_file = str(tmpdir.join('cache', 'project.index'))
+    index = project_index.ProjectIndex(str(tmpdir.join('root')), index_file)
+    assert not index.load()
+    index.update(processes=1)
+    index.save()
+    loaded = project_index.ProjectIndex(str(tmpdir.join('root')), index_file)
+    assert loaded.load()
+    assert index.entries == loaded.entries
+    assert 0 == loaded.update(processes=1)
+
+
+def test_module_name():
+    assert 'package.module' == project_index.module_name(
+        '/root', '/root/package/module.py')
+    assert 'package' == project_index.module_name(
+        '/root', '/root/package/__init__.py')
@@ -0,0 +1,42 @@
+"""Test of the repair of the line under the cursor.
+"""
+# pylint: disable-msg=C0111
+from vim_monty.repair import Repairer, enclosing_block
+
+
+SOURCE_LINES = [
+    'import os',
+    '',
+    'try:',
+    '    import json',
+    'exc',
+    '',
+    'def a_function():',
+    '    a_var = os.',
+    '',
+    'A_CONSTANT = 1',
+]
+
+
+def test_enclosing_block():
+    assert (2, 6) == enclosing_block(SOURCE_LINES, 4)
+    assert (6, 9) == enclosing_block(SOURCE_LINES, 7)
+
+
+def test_candidates():
+    repairer = Repairer()
+    assert '    pass' == repairer.candidates(SOURCE_LINES, 7)[0]
+    assert 'except: pass' == repairer.candidates(SOURCE_LINES, 4)[0]
+    assert SOURCE_LINES[7] == repairer.candidates(SOURCE_LINES, 7)[-1]
+
+
+def test_remember():
+    repairer = Repairer()
+    repairer.remember(SOURCE_LINES[9], 9, '', 'buffer')
+    candidates = repairer.candidates(SOURCE_LINES, 9, 'buffer')
+    assert '' == candidates[0]
+    assert 5 == len(candidates)
+    assert 'pass' == repairer.candidates(SOURCE_LINES, 9, 'other')[0]
+    # a remembered fill is only used while it fits into the block
+    repairer.remember(SOURCE_LINES[7], 7, '    ', 'buffer')
+    assert '    pass' == repairer.candidates(SOURCE_LINES, 7, 'buffer')[0]
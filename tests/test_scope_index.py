@@ -0,0 +1,40 @@
+"""Test of the scope index of buffer modules.
+"""
+# pylint: disable-msg=C0111
+from vim_monty.incremental import IncrementalBuilder
+from vim_monty.source import PyModule
+
+
+SOURCE_LINES = [
+    'import os',
+    '',
+    'A_CONSTANT = 1',
+    '',
+    'class AClass(object):',
+    '    def a_method(self):',
+    '        self.an_attr = 1',
+    '',
+    '@staticmethod',
+    'def a_function(arg):',
+    '    a_var = arg',
+    '',
+    'B_CONSTANT = 2',
+]
+
+
+def test_scope_index():
+    builder = IncrementalBuilder()
+    py_module = PyModule(builder.build(SOURCE_LINES, 'buffer'))
+    assert 'a_method' == py_module.scope(7).name()
+    assert 'AClass' == py_module.scope(5).name()
+    assert '' == py_module.scope(8).name()
+    assert 'a_function' == py_module.scope(11).name()
+    assert '' == py_module.scope(13).name()
+    index = py_module.scope_index()
+    assert index is py_module.scope_index()
+    lines = list(SOURCE_LINES)
+    lines[1:1] = ['def b_function():', '    pass']
+    py_module = PyModule(builder.build(lines, 'buffer'))
+    assert py_module.scope_index() is not index
+    assert 'b_function' == py_module.scope(3).name()
+    assert 'a_method' == py_module.scope(9).name()
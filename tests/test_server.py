@@ -0,0 +1,127 @@
+"""Test of the completion server and its client.
+"""
+# pylint: disable-msg=C0111
+import json
+from Queue import Queue
+import os
+import sys
+from StringIO import StringIO
+import time
+
+import pytest
+
+from vim_monty import client
+from vim_monty import server
+
+
+HERE = os.path.dirname(__file__)
+PLUGIN = os.path.join(HERE, '..', 'plugin')
+FIXTURES = os.path.join(HERE, 'fixtures')
+
+IMPORT_SOURCE = "import a_module\na_module.\n"
+
+
+def test_handle():
+    response = server.handle({'id': 3, 'method': 'find_base_column',
+                              'params': {'line': 'os.pa', 'column': 5}})
+    assert {'id': 3, 'result': 3} == response
+    response = server.handle({'id': 4, 'method': 'unknown'})
+    assert 4 == response['id']
+    assert 'unknown' in response['error']['message']
+    response = server.handle({'id': 5, 'method': 'definition',
+                              'params': {'src': 'X = 1\nX\n', 'line': 'X',
+                                         'lineno': 2, 'column': 0}})
+    assert [None, 1] == list(response['result'])
+
+
+def test_serve():
+    requests = [{'id': 1, 'method': 'ping'},
+                {'id': 2, 'method': 'completion',
+                 'params': {'src': '\n\n', 'line': 'from vim_monty.',
+                            'lineno': 1, 'column': 15, 'base': 'ser',
+                            'builder': 'vim_completion_builder'}}]
+    instream = StringIO(''.join(json.dumps(request) + '\n'
+                                for request in requests) + 'no json\n')
+    outstream = StringIO()
+    server.serve(instream, outstream)
+    responses = [json.loads(line) for line in outstream.getvalue().split('\n')
+                 if line]
+    assert True == responses[0]['result']
+    assert ['server'] == [entry['word'] for entry in responses[1]['result']]
+    assert 'error' in responses[2]
+
+
+def test_client():
+    a_client = client.Client(sys.executable, [PLUGIN, FIXTURES] + sys.path)
+    try:
+        compls = a_client.completion(IMPORT_SOURCE, 'a_module.', 2, 9, 'A_')
+        assert ['A_CLASS', 'A_DICTIONARY', 'A_INSTANCE', 'A_INTEGER',
+                'A_STRING'] == compls
+        assert isinstance(compls[0], str)
+        a_client.process.kill()
+        a_client.process.wait()
+        assert a_client.call('ping')
+    finally:
+        a_client.close()
+
+
+def test_configure():
+    a_client = client.Client(sys.executable, [PLUGIN] + sys.path)
+    try:
+        assert a_client.configure(debug=False, cache_dir=None)
+        a_client.close()
+        assert a_client.call('ping')
+        assert {'debug': False, 'cache_dir': None} == a_client.settings
+    finally:
+        a_client.close()
+
+
+def test_sync():
+    a_client = client.Client(sys.executable, [PLUGIN, FIXTURES] + sys.path)
+    try:
+        lines = IMPORT_SOURCE.split('\n')
+        a_client.sync(7, 1, lines)
+        assert ['A_CLASS'] == a_client.completion(lines, 'a_module.', 2, 9,
+                                                  'A_C', buffer_id=7)
+        assert a_client._source(lines, 7) is None
+        changed = ['import a_module', 'CHANGED = 1', 'a_module.', '']
+        a_client.sync(7, 2, changed)
+        assert ['CHANGED'] == a_client.completion(changed, 'CH', 3, 0, 'CH',
+                                                  buffer_id=7)
+        a_client.process.kill()
+        a_client.process.wait()
+        # the restarted server gets the complete buffer again
+        a_client.call('ping')
+        a_client.sync(7, 2, changed)
+        assert ['CHANGED'] == a_client.completion(changed, 'CH', 3, 0, 'CH',
+                                                  buffer_id=7)
+    finally:
+        a_client.close()
+
+
+def test_receive():
+    a_client = client.Client(sys.executable, timeout=0.01)
+    a_client._responses = Queue()
+    for line in ['no json', json.dumps({'id': 1, 'result': 'old'}),
+                 json.dumps({'id': 2, 'result': 'new'})]:
+        a_client._responses.put(line + '\n')
+    assert 'new' == a_client._receive(2)['result']
+    with pytest.raises(client.ServerError):
+        a_client._receive(3)
+    a_client._responses.put(None)
+    assert a_client._receive(3) is None
+
+
+def test_timeout_keeps_server():
+    closed = []
+    a_client = client.Client(sys.executable, timeout=0.01, hang_timeout=60)
+    a_client.close = lambda kill=False: closed.append(kill)
+    a_client._responses = Queue()
+    a_client._waiting_since = time.time()
+    with pytest.raises(client.ServerError):
+        a_client._receive(1)
+    assert [] == closed
+    a_client._waiting_since = time.time() - 60
+    with pytest.raises(client.ServerError):
+        a_client._receive(1)
+    assert [True] == closed
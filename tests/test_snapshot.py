@@ -0,0 +1,68 @@
+"""Test of the buffer snapshots.
+"""
+# pylint: disable-msg=C0111
+import pytest
+
+from vim_monty import snapshot
+from vim_monty.source import PyModule
+
+
+def test_changed_range():
+    old = ['a', 'b', 'c', 'd']
+    assert snapshot.changed_range(old, list(old)) is None
+    assert (1, 2, ['x', 'y']) == snapshot.changed_range(
+        old, ['a', 'x', 'y', 'c', 'd'])
+    assert (4, 4, ['e']) == snapshot.changed_range(old, old + ['e'])
+    assert (0, 1, []) == snapshot.changed_range(old, old[1:])
+
+
+def test_update():
+    store = snapshot.SnapshotStore()
+    reads = []
+
+    def read_lines():
+        reads.append(1)
+        return ['line']
+    first = store.update(1, 10, read_lines)
+    assert first is store.update(1, 10, read_lines)
+    assert 1 == len(reads)
+    assert first is not store.update(1, 11, read_lines)
+    assert 2 == len(reads)
+
+
+def test_apply():
+    store = snapshot.SnapshotStore()
+    store.apply(1, None, 1, 0, 0, ['a', 'b', 'c'])
+    store.apply(1, 1, 2, 1, 2, ['x', 'y'])
+    assert ['a', 'x', 'y', 'c'] == store.get(1).lines
+    assert 2 == store.get(1).changedtick
+    with pytest.raises(snapshot.OutOfSync):
+        store.apply(1, 1, 3, 0, 0, [])
+    with pytest.raises(snapshot.OutOfSync):
+        store.apply(2, 1, 3, 0, 0, [])
+
+
+def test_lines_are_restored():
+    lines = ['class A(object):', '    def method(self):', '        self.',
+             '']
+    original = list(lines)
+    module = PyModule.by_source(lines, 2)
+    assert 'A' in module.astng_module.locals
+    assert original == lines
+
+
+def test_replaced_line():
+    lines = ['a', 'b', 'c']
+    view = snapshot.ReplacedLine(lines, 1, 'x')
+    assert ['a', 'x', 'c'] == list(view)
+    assert 3 == len(view)
+    assert 'x' == view[1] == view[-2]
+    assert ['x', 'c'] == view[1:]
+    assert ['a'] == view[:1]
+    assert ['a', 'b', 'c'] == lines
+
+
+def test_by_source_keeps_lines():
+    lines = ['import os', 'os.', '']
+    PyModule.by_source(lines, 1)
+    assert ['import os', 'os.', ''] == lines
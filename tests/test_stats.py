@@ -0,0 +1,69 @@
+"""Test of the request statistics.
+"""
+# pylint: disable-msg=C0111
+import json
+import os
+
+from vim_monty import completion
+from vim_monty import stats
+
+
+HERE = os.path.dirname(__file__)
+SOURCE = open(os.path.join(HERE, 'fixtures', 'a_module.py')).read()
+
+
+def test_request():
+    statistics = stats.Stats()
+    with statistics.request('outer') as request:
+        with statistics.span('stage'):
+            statistics.count('counter', 2)
+        with statistics.request('inner'):
+            pass
+        with statistics.span('stage'):
+            pass
+    assert statistics.current() is None
+    assert [request] == list(statistics.requests)
+    assert 2 == request.spans['stage'][0]
+    assert 1 == request.spans['inner'][0]
+    assert {'counter': 2} == request.counters
+    statistics.count('no_request')
+    assert {'counter': 2} == request.counters
+
+
+def test_error():
+    statistics = stats.Stats()
+    with statistics.request('failing') as request:
+        try:
+            raise ValueError('broken')
+        except ValueError:
+            statistics.error()
+    assert 1 == statistics.errors
+    assert 'broken' in request.error
+
+
+def test_completion_stats(tmpdir):
+    stats.STATS.clear()
+    completion(SOURCE, 'A_CLASS.', 26, 8, '')
+    last = stats.STATS.as_dict()['requests'][-1]
+    assert 'completion' == last['name']
+    for stage in ('parse', 'scope', 'lookup', 'accessibles', 'sort',
+                  'build'):
+        assert stage in last['spans']
+    assert last['counters']['repair_attempts'] >= 1
+    assert 'inferred' in stats.STATS.as_dict()['caches']
+    assert 'last completion' in stats.STATS.summary()
+    path = str(tmpdir.join('stats.json'))
+    stats.STATS.dump(path)
+    assert 'requests' in json.load(open(path))
+
+
+def test_profile(monkeypatch):
+    statistics = stats.Stats()
+    monkeypatch.setattr(stats, 'PROFILE_THRESHOLD', 0)
+    with statistics.request('slow') as request:
+        sum(range(100))
+    assert 'function calls' in request.profile
+    monkeypatch.setattr(stats, 'PROFILE_THRESHOLD', 60)
+    with statistics.request('fast') as request:
+        pass
+    assert request.profile is None
@@ -0,0 +1,71 @@
+"""Test of handing python values to Vim.
+"""
+# pylint: disable-msg=C0111
+import json
+
+from vim_monty import vim_values
+
+
+class FakeVim(object):
+    """Records the commands, like a Vim without ``bindeval``.
+    """
+    def __init__(self, has_json_decode):
+        self.has_json_decode = has_json_decode
+        self.commands = []
+
+    def eval(self, expression):
+        assert "exists('*json_decode')" == expression
+        return self.has_json_decode and '1' or '0'
+
+    def command(self, command):
+        self.commands.append(command)
+
+
+class FakeBindevalVim(FakeVim):
+    def __init__(self):
+        FakeVim.__init__(self, True)
+        self.scopes = {'l:': {}}
+
+    def bindeval(self, expression):
+        return self.scopes[expression]
+
+
+ENTRIES = [{'word': 'it\'s "quoted" \\', 'menu': u'\xe4', 'dup': '1'},
+           {'word': 'line\nbreak', 'menu': '', 'dup': '1'}]
+
+
+def test_vim_string():
+    assert '"plain"' == vim_values.vim_string('plain')
+    assert '"it\'s \\"a\\" \\\\"' == vim_values.vim_string('it\'s "a" \\')
+    assert '"a\\nb\\x01"' == vim_values.vim_string('a\nb\x01')
+    assert '"\xc3\xa4"' == vim_values.vim_string(u'\xe4')
+    assert '"\xe4"' == vim_values.vim_string(u'\xe4', 'latin-1')
+
+
+def test_vim_literal():
+    assert '[1,"a",\'\']' == vim_values.vim_literal([1, 'a', None])
+    assert '{"word":"\\"w\\""}' == vim_values.vim_literal({'word': '"w"'})
+
+
+def test_to_json():
+    value = json.loads(vim_values.to_json(ENTRIES))
+    assert u'it\'s "quoted" \\' == value[0]['word']
+    assert u'\xe4' == value[0]['menu']
+    assert u'\ufffd' == json.loads(vim_values.to_json('\xff'))
+    assert all(ord(character) < 128
+               for character in vim_values.to_json(ENTRIES))
+
+
+def test_let():
+    vim = FakeBindevalVim()
+    assert vim_values.BINDEVAL == vim_values.let(vim, 'l:result', ENTRIES)
+    assert '\xc3\xa4' == vim.scopes['l:']['result'][0]['menu']
+    assert not vim.commands
+
+    vim = FakeVim(True)
+    assert vim_values.JSON == vim_values.let(vim, 'l:result', ENTRIES)
+    assert vim.commands[0].startswith('let l:result = json_decode("[{')
+
+    vim = FakeVim(False)
+    assert vim_values.LITERAL == vim_values.let(vim, 'l:result', [1])
+    assert ['let l:result = [1]'] == vim.commands
@@ -0,0 +1,97 @@
+"""Test of the completion worker thread.
+"""
+# pylint: disable-msg=C0111
+import os
+import time
+from threading import Event, Thread
+
+from vim_monty import cache
+from vim_monty import completion
+from vim_monty import source
+from vim_monty import worker
+
+
+HERE = os.path.dirname(__file__)
+SOURCE = open(os.path.join(HERE, 'fixtures', 'a_module.py')).read()
+
+
+def test_completion():
+    compls = worker.completion(SOURCE, 'A_CLASS.', 26, 8, '', buffer_id=1,
+                               budget=None)
+    assert completion(SOURCE, 'A_CLASS.', 26, 8, '') == compls
+
+
+def test_partial():
+    file_state = source.FileState('        ', SOURCE, 16, 8)
+    request = worker.CompletionRequest(file_state)
+    request.run()
+    assert 'arg1' in request.partial
+    assert request.partial == request.result
+
+    file_state = source.FileState('AClass.', SOURCE, 26, 7)
+    request = worker.CompletionRequest(file_state)
+    request.run()
+    assert request.partial is None
+    assert 'a_method' in request.result
+
+
+def test_cancel():
+    a_worker = worker.CompletionWorker()
+    requests = [worker.CompletionRequest(source.FileState('', SOURCE, 26, 0,
+                                                          buffer_id))
+                for buffer_id in (1, 2, 1)]
+    a_worker._pending.append(requests[0])
+    a_worker._pending.append(requests[1])
+    a_worker.submit(requests[2])
+    assert requests[0].cancelled
+    assert not requests[1].cancelled
+    assert [] == requests[0].wait(0)
+    assert 'AClass' in requests[2].wait(None)
+
+
+def test_cancel_running():
+    a_worker = worker.CompletionWorker()
+    running = worker.CompletionRequest(source.FileState('', SOURCE, 26, 0, 1))
+    a_worker._running = running
+    a_worker.submit(worker.CompletionRequest(
+        source.FileState('', SOURCE, 26, 0, 1)))
+    assert running.cancelled
+    running.run()
+    assert running.result is None
+
+
+def test_budget_while_busy():
+    locked = Event()
+    release = Event()
+
+    def hold_lock():
+        with cache.LOCK:
+            locked.set()
+            release.wait()
+    thread = Thread(target=hold_lock)
+    thread.start()
+    locked.wait()
+    try:
+        start = time.time()
+        assert [] == worker.completion(SOURCE, '        ', 16, 8, '',
+                                       buffer_id='busy', budget=0.05)
+        assert time.time() - start < 1
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_cancel_between_pages(monkeypatch):
+    monkeypatch.setattr(source, 'PAGE_SIZE', 2)
+    built = []
+
+    def cancelling_builder(completionable, file_state):
+        built.append(completionable)
+        request.cancel()
+        return completionable.name()
+    request = worker.CompletionRequest(
+        source.FileState('A_CLASS.', SOURCE, 26, 8),
+        completion_builder=cancelling_builder)
+    request.run()
+    assert request.result is None
+    assert 2 == len(built)